@@ -0,0 +1,186 @@
+"""
+Benchmark of rendering pages grouped by layout template, against rendering
+them in discovery order with the template resolved for every page.
+
+Generates a synthetic site with a few layouts and many pages in a temporary
+directory. Reports the time spent in the layout phase alone, which is what
+grouping affects, and the time of a full build with both strategies.
+
+Usage:
+
+    $ python benchmarks/bench_layouts.py [--pages 2000] [--layouts 4] [--repeat 3]
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from web_maker import osutils  # noqa: E402
+from web_maker.build import SiteBuilder, discover_content  # noqa: E402
+from web_maker.config import load_config  # noqa: E402
+
+
+CONF = """
+site_name = "Benchmark"
+content_path = "content/"
+template_path = "templates/"
+dist_path = "dist/"
+default_template = "layout0.html"
+html_base_url = "http://example.com/"
+"""
+
+MACROS = """
+{% macro card(title, body) -%}
+<div class="card"><h2>{{ title }}</h2><div>{{ body }}</div></div>
+{%- endmacro %}
+{% macro nav(items) -%}
+<nav>{% for item in items %}<a href="#{{ item }}">{{ item }}</a>{% endfor %}</nav>
+{%- endmacro %}
+"""
+
+BASE = """<html><head><title>{{ page.meta.title }}</title></head>
+<body>{% block body %}{% endblock %}</body></html>
+"""
+
+LAYOUT = """{% extends "base.html" %}
+{% import "macros.html" as m %}
+{% block body %}
+{{ m.nav(["a", "b", "c", "d", "e"]) }}
+{% for i in range(20) %}{{ m.card(page.meta.title ~ i, "layout @N@") }}{% endfor %}
+{{ page.content }}
+{% endblock %}
+"""
+
+PAGE = """---
+title: Page {i}
+template: layout{layout}.html
+---
+# Page {i}
+
+Some *text* for page {i}.
+"""
+
+
+class WalkOrderBuilder(SiteBuilder):
+    """Renders pages in discovery order, resolving the layout for every page."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.template_env.auto_reload = True
+
+    def _order_by_layout(self, page_paths):
+        return page_paths
+
+    def _get_layout(self, template_name):
+        return self.template_env.get_template(template_name)
+
+
+def create_site(site_dir, pages, layouts):
+    os.makedirs(os.path.join(site_dir, "content"))
+    os.makedirs(os.path.join(site_dir, "templates"))
+
+    with open(os.path.join(site_dir, "conf.py"), "w") as fp:
+        fp.write(CONF)
+
+    templates = {"base.html": BASE, "macros.html": MACROS}
+    for n in range(layouts):
+        templates["layout%d.html" % n] = LAYOUT.replace("@N@", str(n))
+
+    for name, source in templates.items():
+        with open(os.path.join(site_dir, "templates", name), "w") as fp:
+            fp.write(source)
+
+    # Interleave layouts, so discovery order jumps between them.
+    for i in range(pages):
+        file_path = os.path.join(site_dir, "content", "page%05d.md" % i)
+        with open(file_path, "w") as fp:
+            fp.write(PAGE.format(i=i, layout=i % layouts))
+
+
+def time_layouts(builder_cls, config):
+    """Time resolving and rendering the layout of every page, without Markdown."""
+    builder = builder_cls(config, force=True)
+    page_paths, _ = discover_content(config["content_path"])
+
+    # Metadata is loaded up front in both strategies, so only
+    # template resolution and rendering are timed.
+    pages = [
+        (
+            builder._layout_name(filepath),
+            {
+                "meta": builder.page_loader.get_meta(filepath),
+                "content": "<p>content</p>",
+                "file_location": filepath,
+            },
+        )
+        for filepath in builder._order_by_layout(page_paths)
+    ]
+
+    start = time.perf_counter()
+    for template_name, page in pages:
+        template = builder._get_layout(template_name)
+        template.render(page=page, **builder.model)
+    return time.perf_counter() - start
+
+
+def time_build(builder_cls, config):
+    start = time.perf_counter()
+    builder_cls(config, force=True).build()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--layouts", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as site_dir:
+        create_site(site_dir, args.pages, args.layouts)
+
+        with osutils.cd(site_dir):
+            config = load_config(".")
+
+            print(
+                "%d pages, %d layouts, best of %d"
+                % (args.pages, args.layouts, args.repeat)
+            )
+
+            for label, timer in (
+                ("Layout phase", time_layouts),
+                ("Full build", time_build),
+            ):
+                # Strategies alternate between rounds, so drift in the
+                # machine's state doesn't favour either of them.
+                results = {"walk order": [], "grouped": []}
+                for _ in range(args.repeat):
+                    for name, builder_cls in (
+                        ("walk order", WalkOrderBuilder),
+                        ("grouped", SiteBuilder),
+                    ):
+                        gc.collect()
+                        results[name].append(timer(builder_cls, config))
+                results = {name: min(times) for name, times in results.items()}
+
+                print(label)
+                for name, seconds in results.items():
+                    print(
+                        "  %-12s %8.3fs  %6.3fms/page"
+                        % (name, seconds, seconds * 1000 / args.pages)
+                    )
+                print(
+                    "  speedup      %8.2fx"
+                    % (results["walk order"] / results["grouped"])
+                )
+
+
+if __name__ == "__main__":
+    main()
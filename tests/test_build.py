@@ -0,0 +1,62 @@
+import pytest
+from jinja2 import UndefinedError
+
+from web_maker.build import build_content
+from web_maker.config import load_config
+
+
+SITE_CONF = """
+site_name = "Test"
+content_path = "content"
+template_path = "templates"
+dist_path = "dist"
+default_template = "page.html"
+html_base_url = "http://example.com/"
+"""
+
+
+@pytest.fixture()
+def site(tmp_path, monkeypatch):
+    """Project with a page using an undefined variable, in the working directory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "conf.py").write_text(SITE_CONF)
+    (tmp_path / "content").mkdir()
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("{{ page.content }}")
+    (tmp_path / "content" / "index.md").write_text(
+        "---\ntitle: Home\n---\n# {{ site_nmae }}\n"
+    )
+
+    return load_config(".")
+
+
+def test_strict_build_after_incremental_build(site, tmp_path):
+    build_content(site)
+    assert (tmp_path / "dist" / "index.html").exists()
+
+    # The page is unchanged, but a strict build must render it again.
+    with pytest.raises(UndefinedError):
+        build_content(site, strict=True)
+
+
+def test_html_written_without_front_matter(site, tmp_path):
+    (tmp_path / "content" / "raw.html").write_text("---\ntitle: Raw\n---\n<p>Raw</p>\n")
+
+    build_content(site)
+
+    assert (tmp_path / "dist" / "raw.html").read_text() == "<p>Raw</p>\n"
+
+
+def test_prune_after_build_without_prune(site, tmp_path):
+    (tmp_path / "content" / "index.md").write_text("# Home\n")
+    (tmp_path / "content" / "about.md").write_text("# About\n")
+    build_content(site)
+
+    # The build after a source is removed leaves its output for a later prune.
+    (tmp_path / "content" / "about.md").unlink()
+    build_content(site)
+    assert (tmp_path / "dist" / "about.html").exists()
+
+    build_content(site, prune=True)
+    assert not (tmp_path / "dist" / "about.html").exists()
+    assert (tmp_path / "dist" / "index.html").exists()
@@ -0,0 +1,88 @@
+import pytest
+
+from web_maker.check import check_site
+
+
+@pytest.fixture()
+def site(tmp_path, monkeypatch):
+    """Minimal project with one layout and one page, in the working directory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "content").mkdir()
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text(
+        "<title>{{ page.meta.title }}</title>{{ page.content }}"
+    )
+    (tmp_path / "content" / "index.md").write_text("---\ntitle: Home\n---\n# Home\n")
+
+    return {
+        "site_name": "Test",
+        "content_path": "content",
+        "template_path": "templates",
+        "dist_path": "dist",
+        "default_template": "page.html",
+        "html_base_url": "/",
+        "image_widths": [],
+    }
+
+
+def messages(problems):
+    return [(problem.file_path, problem.line, problem.message) for problem in problems]
+
+
+def test_check_clean(site):
+    assert check_site(site) == []
+
+
+def test_check_template_syntax_error(site, tmp_path):
+    (tmp_path / "templates" / "page.html").write_text("<p>\n{% if %}\n")
+
+    assert messages(check_site(site)) == [
+        (
+            "templates/page.html",
+            2,
+            "Expected an expression, got 'end of statement block'",
+        )
+    ]
+
+
+def test_check_undefined_variable(site, tmp_path):
+    (tmp_path / "content" / "index.md").write_text(
+        "---\ntitle: Home\n---\n# Home\n\n{{ site_nmae }}\n"
+    )
+
+    # Line numbers count the front matter.
+    assert messages(check_site(site)) == [
+        ("content/index.md", 6, "undefined variable 'site_nmae'")
+    ]
+
+
+def test_check_meta_fields(site, tmp_path):
+    (tmp_path / "templates" / "page.html").write_text(
+        "{{ page.meta.titel }}\n"
+        "{% for p in list_pages('*.md') %}{{ p.meta['sumary'] }}{% endfor %}"
+    )
+
+    assert messages(check_site(site)) == [
+        ("templates/page.html", 1, "unknown metadata field 'titel'"),
+        ("templates/page.html", 2, "unknown metadata field 'sumary'"),
+    ]
+
+
+def test_check_missing_templates(site, tmp_path):
+    (tmp_path / "templates" / "page.html").write_text("{% extends 'base.html' %}")
+    (tmp_path / "content" / "index.md").write_text("---\ntemplate: post.html\n---\n")
+
+    assert messages(check_site(site)) == [
+        ("templates/page.html", 1, "template 'base.html' does not exist"),
+        ("content/index.md", None, "template 'post.html' does not exist"),
+    ]
+
+
+def test_check_url_target(site, tmp_path):
+    (tmp_path / "content" / "index.md").write_text(
+        "[Home]({{ url('content/index.md') }}) [About]({{ url('content/about.md') }})"
+    )
+
+    assert messages(check_site(site)) == [
+        ("content/index.md", 1, "url target 'content/about.md' does not exist")
+    ]
@@ -0,0 +1,50 @@
+import gzip
+import os
+
+import pytest
+
+from web_maker.compress import Compressor
+from web_maker.writer import OutputWriter
+
+
+@pytest.fixture
+def compressor(tmp_path, monkeypatch):
+    # Only gzip, so the tests don't depend on brotli being installed.
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+    return Compressor(str(tmp_path / "cache"))
+
+
+def test_accepts(compressor):
+    assert compressor.accepts("dist/index.html")
+    assert compressor.accepts("dist/style.CSS")
+    assert not compressor.accepts("dist/photo.jpg")
+    assert compressor.sibling_paths("dist/app.js") == ["dist/app.js.gz"]
+    assert compressor.sibling_paths("dist/photo.jpg") == []
+
+
+def test_writer_compresses(compressor, tmp_path):
+    dist = tmp_path / "dist"
+
+    with OutputWriter(compressor=compressor) as writer:
+        writer.write(str(dist / "index.html"), "<p>Hello</p>")
+        writer.write(str(dist / "photo.jpg"), b"jpeg")
+
+    assert gzip.decompress((dist / "index.html.gz").read_bytes()) == b"<p>Hello</p>"
+    assert not (dist / "photo.jpg.gz").exists()
+
+
+def test_compress_skips_unchanged(compressor, tmp_path):
+    file_path = str(tmp_path / "index.html")
+
+    [(sibling_path, _)] = compressor.compress(file_path, b"<p>Hello</p>")
+    assert sibling_path == file_path + ".gz"
+    compressor.save()
+
+    # Hashes persist across builds.
+    compressor = Compressor(str(tmp_path / "cache"))
+    assert compressor.compress(file_path, b"<p>Hello</p>") == []
+    assert len(compressor.compress(file_path, b"<p>Changed</p>")) == 1
+
+    # Deleted variants are written again.
+    os.remove(file_path + ".gz")
+    assert len(compressor.compress(file_path, b"<p>Changed</p>")) == 1
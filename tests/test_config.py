@@ -1,8 +1,9 @@
+import json
 import os
 
 import pytest
 
-from web_maker.config import load_config
+from web_maker.config import CACHE_DIR, CONFIG_SNAPSHOT, load_config
 
 
 SAMPLE_YAML = """# Test configuration file
@@ -23,3 +24,53 @@ def test_config_walk(config_directory):
     print(config)
     assert config["site_name"] == "Test Site"
     assert config["content_dir"] == "content/"
+
+
+SAMPLE_CONF = """
+site_name = "Test Site"
+content_path = "content/"
+template_path = "templates/"
+dist_path = "dist/"
+default_template = "page.html"
+html_base_url = "http://sample-config.com/"
+"""
+
+
+def test_config_snapshot(tmp_path):
+    conf_path = os.path.join(tmp_path, "conf.py")
+    with open(conf_path, "w") as fp:
+        fp.write(SAMPLE_CONF)
+
+    config = load_config(tmp_path, use_cache=True)
+    assert config["site_name"] == "Test Site"
+
+    # Tamper with the snapshot to prove the config file isn't executed again.
+    snapshot_path = os.path.join(tmp_path, CACHE_DIR, CONFIG_SNAPSHOT)
+    with open(snapshot_path) as fp:
+        snapshot = json.load(fp)
+    snapshot["config"]["site_name"] = "Cached"
+    with open(snapshot_path, "w") as fp:
+        json.dump(snapshot, fp)
+
+    assert load_config(tmp_path, use_cache=True)["site_name"] == "Cached"
+    assert load_config(tmp_path)["site_name"] == "Test Site"
+
+    # Changing the config file invalidates the snapshot.
+    with open(conf_path, "a") as fp:
+        fp.write('site_name = "Changed"\n')
+
+    assert load_config(tmp_path, use_cache=True)["site_name"] == "Changed"
+
+
+def test_config_snapshot_disabled(tmp_path, monkeypatch):
+    with open(os.path.join(tmp_path, "conf.py"), "w") as fp:
+        fp.write(SAMPLE_CONF)
+        fp.write('import os\nsite_name = os.environ["SITE_NAME"]\n')
+        fp.write("config_cache = False\n")
+
+    monkeypatch.setenv("SITE_NAME", "First")
+    assert load_config(tmp_path, use_cache=True)["site_name"] == "First"
+
+    monkeypatch.setenv("SITE_NAME", "Second")
+    assert load_config(tmp_path, use_cache=True)["site_name"] == "Second"
+    assert not os.path.exists(os.path.join(tmp_path, CACHE_DIR, CONFIG_SNAPSHOT))
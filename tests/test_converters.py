@@ -0,0 +1,112 @@
+import importlib.util
+
+import pytest
+from jinja2 import Environment
+
+from web_maker.converters import (
+    ConverterError,
+    ConverterRegistry,
+    HtmlConverter,
+    JupyterHtmlConverter,
+    MarkdownConverter,
+    create_converters,
+)
+from web_maker.loader import PageLoader
+
+
+@pytest.fixture
+def converters():
+    return create_converters(Environment())
+
+
+@pytest.mark.parametrize(
+    "file_path,converter_type",
+    [
+        ("content/index.md", MarkdownConverter),
+        ("content/index.MARKDOWN", MarkdownConverter),
+        ("content/notes.txt", MarkdownConverter),
+        ("content/page.html", HtmlConverter),
+        ("content/page.htm", HtmlConverter),
+        ("content/analysis.nb.html", JupyterHtmlConverter),
+    ],
+)
+def test_registry_lookup(converters, file_path, converter_type):
+    assert type(converters.get(file_path)) is converter_type
+
+
+def test_registry_reuses_converters(converters):
+    assert converters.get("content/a.md") is converters.get("content/b.markdown")
+
+
+def test_registry_without_default():
+    with pytest.raises(ConverterError):
+        ConverterRegistry().get("content/index.md")
+
+
+def test_markdown_reset_between_files(converters):
+    converter = converters.get("content/index.md")
+
+    first = converter.convert(
+        "---\ntitle: A\n---\n# {{ name }}[^1]\n\n[^1]: Note", {"name": "A"}
+    )
+    second = converter.convert("# {{ name }}", {"name": "B"})
+
+    assert first.startswith('<h1 id="a1">A')
+    assert 'class="footnote"' in first
+
+    # Footnotes of the first file don't carry over.
+    assert second == '<h1 id="b">B</h1>'
+
+
+def test_markdown_abbreviations_reset_between_files(converters):
+    converter = converters.get("content/index.md")
+
+    first = converter.convert("*[HTML]: Hyper Text\n\nHTML", {})
+    second = converter.convert("HTML", {})
+
+    assert '<abbr title="Hyper Text">HTML</abbr>' in first
+    assert "<abbr" not in second
+
+
+def test_jupyter_html(converters):
+    export = (
+        "<html><head><title>Notebook</title><style>.cell {}</style></head>"
+        '<body><div class="cell">{{ not_jinja }}</div></body></html>'
+    )
+
+    assert converters.get("content/analysis.nb.html").convert(export, {}) == (
+        '<style>.cell {}</style><div class="cell">{{ not_jinja }}</div>'
+    )
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("docutils") is None, reason="docutils not installed"
+)
+def test_restructured_text(converters):
+    html = converters.get("content/index.rst").convert(
+        "---\ntitle: A\n---\nTitle\n=====\n\nHello *{{ name }}*", {"name": "World"}
+    )
+
+    assert "<h1>Title</h1>" in html
+    assert "<em>World</em>" in html
+
+
+def test_html_strips_meta(converters):
+    converter = converters.get("content/page.html")
+
+    assert converter.convert("---\ntitle: A\n---\n<p>{{ x }}</p>", {}) == (
+        "<p>{{ x }}</p>"
+    )
+
+
+def test_jupyter_html_with_marker_lines(tmp_path, converters):
+    # Output cells may print lines that look like front matter markers.
+    export = "<html><body><pre>\n---\nscores: [1, 2\n---\n</pre></body></html>"
+    file_path = tmp_path / "analysis.nb.html"
+    file_path.write_text(export)
+
+    metadata = PageLoader().get_meta(str(file_path))
+    html = converters.get(str(file_path)).convert(export, {})
+
+    assert metadata["title"] == "page"
+    assert html == "<pre>\n---\nscores: [1, 2\n---\n</pre>"
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from web_maker.deps import (
+    ALL_FIELDS,
+    BuildState,
+    DependencyRecorder,
+    DependencyResolver,
+    RecordingDict,
+)
+from web_maker.loader import PageLoader
+from web_maker.template import create_list_pages, match_pages
+
+
+POST = """---
+title: {title}
+---
+{body}
+"""
+
+
+@pytest.fixture
+def content_dir(tmp_path):
+    content_path = os.path.join(tmp_path, "content")
+    os.makedirs(os.path.join(content_path, "posts"))
+    for name in ("a", "b"):
+        write_post(content_path, name, name.upper(), "Body")
+    yield content_path
+
+
+def write_post(content_path, name, title, body):
+    with open(os.path.join(content_path, "posts", name + ".md"), "w") as fp:
+        fp.write(POST.format(title=title, body=body))
+
+
+def render_index(content_path, recorder):
+    """Simulates a template listing the titles of all posts."""
+    list_pages = create_list_pages(content_path, PageLoader(), recorder=recorder)
+    return [page["meta"]["title"] for page in list_pages("posts/*.md")]
+
+
+def new_resolver(content_path):
+    loader = PageLoader()
+    return DependencyResolver(
+        lambda pattern: match_pages(content_path, pattern), loader.get_meta
+    )
+
+
+def test_recording_dict():
+    fields = set()
+    meta = RecordingDict({"title": "A", "draft": False}, fields)
+
+    assert meta["title"] == "A"
+    assert meta.get("created") is None
+    assert fields == {"title", "created"}
+
+    list(meta.items())
+    assert ALL_FIELDS in fields
+
+
+def test_recorder_queries(content_dir):
+    recorder = DependencyRecorder()
+
+    assert sorted(render_index(content_dir, recorder)) == ["A", "B"]
+    assert recorder.queries == {"posts/*.md": {"title"}}
+
+
+@pytest.mark.parametrize(
+    "title,body,fresh",
+    [
+        ("B", "Edited body", True),
+        ("Edited title", "Body", False),
+    ],
+)
+def test_state_freshness(content_dir, title, body, fresh):
+    recorder = DependencyRecorder()
+    render_index(content_dir, recorder)
+
+    state = BuildState("key")
+    state.record("content/index.md", "hash", recorder, new_resolver(content_dir))
+
+    write_post(content_dir, "b", title, body)
+
+    resolver = new_resolver(content_dir)
+    assert state.is_fresh("content/index.md", "hash", resolver) is fresh
+    assert not state.is_fresh("content/index.md", "other", resolver)
+
+
+def test_state_new_page(content_dir):
+    recorder = DependencyRecorder()
+    render_index(content_dir, recorder)
+
+    state = BuildState("key")
+    state.record("content/index.md", "hash", recorder, new_resolver(content_dir))
+
+    write_post(content_dir, "c", "C", "Body")
+
+    assert not state.is_fresh("content/index.md", "hash", new_resolver(content_dir))
+
+
+def test_state_roundtrip(tmp_path):
+    state = BuildState("key", {"content/index.md": {"source": "hash"}})
+    state.save(tmp_path)
+
+    assert BuildState.load(tmp_path, "key").pages == state.pages
+    assert BuildState.load(tmp_path, "other").pages == {}
+
+
+def test_state_carries_links(content_dir):
+    recorder = DependencyRecorder()
+    resolver = new_resolver(content_dir)
+
+    previous = BuildState("key")
+    previous.record("content/index.md", "hash", recorder, resolver, ["a.html"], ["top"])
+
+    state = BuildState("key")
+    state.carry(previous, "content/index.md")
+
+    assert state.pages["content/index.md"]["links"] == ["a.html"]
+    assert state.pages["content/index.md"]["ids"] == ["top"]
@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+
+from web_maker.events import (
+    BUILD_FINISHED,
+    BUILD_STARTED,
+    CACHE_HIT,
+    CACHE_MISS,
+    FILE_WRITTEN,
+    PAGE_FINISHED,
+    EventBus,
+    EventSink,
+    JsonLinesSink,
+    LogSummarySink,
+    MetricsSink,
+)
+
+
+class ListSink(EventSink):
+    def __init__(self):
+        self.events = []
+
+    def handle(self, event):
+        self.events.append(event)
+
+
+def test_bus_without_sinks():
+    bus = EventBus()
+    assert not bus.enabled
+    bus.emit(PAGE_FINISHED, path="content/index.md", duration=0.1)
+
+
+def test_bus_stage():
+    sink = ListSink()
+    with EventBus([sink]) as bus:
+        with bus.stage("render"):
+            pass
+
+    assert len(sink.events) == 1
+    assert sink.events[0]["stage"] == "render"
+    assert sink.events[0]["duration"] >= 0
+
+
+def test_json_lines_sink(tmp_path):
+    file_path = os.path.join(tmp_path, "events.jsonl")
+
+    with EventBus([JsonLinesSink(file_path)]) as bus:
+        bus.emit(CACHE_HIT, cache="build", path="content/index.md")
+        bus.emit(FILE_WRITTEN, path="dist/index.html", bytes=10)
+
+    with open(file_path) as fp:
+        events = [json.loads(line) for line in fp]
+
+    assert [event["event"] for event in events] == [CACHE_HIT, FILE_WRITTEN]
+    assert events[1]["bytes"] == 10
+
+
+def test_metrics_sink(tmp_path):
+    file_path = os.path.join(tmp_path, "metrics.prom")
+
+    with EventBus([MetricsSink(file_path)]) as bus:
+        bus.emit(CACHE_MISS, cache="build", path="content/a.md")
+        bus.emit(PAGE_FINISHED, path="content/a.md", duration=0.5)
+        bus.emit(CACHE_HIT, cache="build", path="content/b.md")
+        bus.emit(FILE_WRITTEN, path="dist/a.html", bytes=100)
+        bus.emit(FILE_WRITTEN, path="dist/a.html.gz", bytes=20)
+        bus.emit(BUILD_FINISHED, duration=1.5)
+
+    with open(file_path) as fp:
+        lines = fp.read().splitlines()
+
+    assert "web_maker_pages_rendered_total 1" in lines
+    assert "web_maker_bytes_written_total 120" in lines
+    assert 'web_maker_cache_lookups_total{cache="build",result="hit"} 1' in lines
+    assert 'web_maker_cache_lookups_total{cache="build",result="miss"} 1' in lines
+    assert "web_maker_build_seconds 1.500000" in lines
+
+
+def test_log_summary_sink(caplog):
+    caplog.set_level(logging.INFO, logger="web_maker.events")
+
+    # A zero interval reports after every file.
+    with EventBus([LogSummarySink(interval=0)]) as bus:
+        bus.emit(BUILD_STARTED, pages=2, images=0)
+        bus.emit(CACHE_MISS, cache="build", path="content/a.md")
+        bus.emit(CACHE_HIT, cache="build", path="content/b.md")
+        bus.emit(FILE_WRITTEN, path="dist/a.html", bytes=100)
+        bus.emit(BUILD_FINISHED, duration=1.5)
+
+    assert caplog.messages == [
+        "Processed 1/2 files (0 up to date)",
+        "Processed 2/2 files (1 up to date)",
+        "Processed 2 files: 1 built, 1 up to date, 1 written (100 bytes) in 1.50s",
+    ]
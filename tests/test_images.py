@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from web_maker.images import ImageProcessor, is_image, variant_path
+from web_maker.writer import OutputWriter
+
+
+@pytest.mark.parametrize(
+    "filename,result",
+    [
+        ("content/photo.jpg", True),
+        ("content/photo.JPEG", True),
+        ("content/logo.png", True),
+        ("content/index.md", False),
+        ("content/png", False),
+    ],
+)
+def test_is_image(filename, result):
+    assert is_image(filename) is result
+
+
+@pytest.mark.parametrize(
+    "filename,width,result",
+    [
+        ("content/photo.jpg", 320, "content/photo-320w.jpg"),
+        ("content/a.b/photo", 640, "content/a.b/photo-640w"),
+    ],
+)
+def test_variant_path(filename, width, result):
+    assert variant_path(filename, width) == result
+
+
+def test_image_variants(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+
+    source_path = os.path.join(tmp_path, "photo.png")
+    Image.new("RGB", (800, 400)).save(source_path)
+
+    cache_path = os.path.join(tmp_path, "cache")
+    target_path = os.path.join(tmp_path, "dist", "photo.png")
+
+    with OutputWriter() as writer:
+        with ImageProcessor(cache_path, [200, 1000], max_workers=1) as images:
+            images.submit(source_path, "hash", target_path, writer)
+            images.finish(writer)
+
+    with Image.open(os.path.join(tmp_path, "dist", "photo-200w.png")) as image:
+        assert image.size == (200, 100)
+
+    # Images are never scaled up.
+    with Image.open(os.path.join(tmp_path, "dist", "photo-1000w.png")) as image:
+        assert image.size == (800, 400)
+
+    assert os.path.exists(target_path)
+    assert sorted(os.listdir(os.path.join(cache_path, "images"))) == [
+        "hash-1000.png",
+        "hash-200.png",
+    ]
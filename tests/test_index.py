@@ -0,0 +1,104 @@
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import pytest
+
+from web_maker.index import PageIndex, PageIndexError
+from web_maker.loader import PageLoader
+
+
+RECORDS = [
+    {
+        "file_path": "content/posts/b.md",
+        "meta": {"title": "B", "created": datetime.date(2020, 1, 2)},
+        "output": "posts/b.html",
+        "url": "http://example.com/posts/b.html",
+    },
+    {
+        "file_path": "content/index.md",
+        "meta": {"title": "Home"},
+        "output": "index.html",
+        "url": "http://example.com/index.html",
+    },
+    {
+        "file_path": "content/./posts/a.md",
+        "meta": {"title": "A"},
+        "output": "posts/a.html",
+        "url": "http://example.com/posts/a.html",
+    },
+]
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    file_path = os.path.join(tmp_path, "pages.idx")
+    PageIndex.write(file_path, RECORDS)
+    yield file_path
+
+
+def _worker_title(index_path, file_path):
+    with PageIndex.open(index_path) as index:
+        return PageLoader(index).get_meta(file_path)["title"]
+
+
+def test_index_lookup(index_path):
+    with PageIndex.open(index_path) as index:
+        assert len(index) == 3
+        assert list(index) == [
+            "content/index.md",
+            "content/posts/a.md",
+            "content/posts/b.md",
+        ]
+        assert "content/posts/a.md" in index
+        assert "content/posts/c.md" not in index
+        assert index.get("content/posts/c.md") is None
+
+        record = index.get("content/posts/b.md")
+        assert record["meta"]["created"] == datetime.date(2020, 1, 2)
+        assert record["output"] == "posts/b.html"
+
+
+def test_index_empty():
+    index = PageIndex(PageIndex.dumps([]))
+    assert len(index) == 0
+    assert index.get("content/index.md") is None
+
+
+def test_index_invalid(tmp_path):
+    file_path = os.path.join(tmp_path, "pages.idx")
+    with open(file_path, "wb") as fp:
+        fp.write(b"not an index file")
+
+    with pytest.raises(PageIndexError):
+        PageIndex.open(file_path)
+
+
+def test_index_worker_process(index_path):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(_worker_title, index_path, "content/posts/a.md")
+        assert future.result() == "A"
+
+
+def test_loader_streaming(tmp_path):
+    file_path = os.path.join(tmp_path, "index.md")
+    with open(file_path, "w") as fp:
+        fp.write("---\ntitle: Disk\n---\nBody")
+
+    loader = PageLoader(keep_bodies=False)
+    assert loader.get_meta(file_path)["title"] == "Disk"
+
+    index_path = os.path.join(tmp_path, "pages.idx")
+    PageIndex.write(
+        index_path, [{"file_path": file_path, "meta": {"title": "Indexed"}}]
+    )
+
+    with PageIndex.open(index_path) as index:
+        loader.attach_index(index)
+
+        # Metadata comes from the index, and contents are read from disk.
+        assert loader.get_meta(file_path)["title"] == "Indexed"
+        assert loader.load_page(file_path).endswith(b"Body")
+        assert loader.get_meta(file_path)["title"] == "Indexed"
+
+        loader.attach_index(None)
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+
+from web_maker.links import BrokenLink, check_links, extract_links, write_link_report
+
+
+BASE_URL = "https://example.com/blog/"
+
+OUTPUTS = {"index.html", "posts/a.html", "posts/index.html", "images/photo.jpg"}
+
+
+def test_extract_links():
+    soup = BeautifulSoup(
+        '<link href="style.css"><h1 id="intro">Intro</h1><a name="top"></a>'
+        '<a href="posts/a.html#intro">A</a><a href="posts/a.html#intro">A</a>'
+        '<img src="images/photo.jpg"><a>No href</a>',
+        features="html.parser",
+    )
+
+    assert extract_links(soup) == (
+        ["images/photo.jpg", "posts/a.html#intro", "style.css"],
+        ["intro", "top"],
+    )
+
+
+@pytest.mark.parametrize(
+    "href",
+    [
+        "posts/a.html",
+        "/blog/posts/a.html",
+        "https://example.com/blog/posts/a.html",
+        "posts/",
+        "posts",
+        "./",
+        "images/photo.jpg",
+        "#intro",
+        "posts/a.html#section",
+        "https://github.com/missing.html",
+        "mailto:someone@example.com",
+        "/elsewhere/missing.html",
+    ],
+)
+def test_check_links_valid(href):
+    pages = {
+        "index.html": ([href], ["intro"]),
+        "posts/a.html": ([], ["section"]),
+    }
+
+    assert check_links(BASE_URL, pages, OUTPUTS)[1] == []
+
+
+@pytest.mark.parametrize(
+    "href,reason",
+    [
+        ("posts/b.html", "missing file"),
+        ("posts/a.html#missing", "missing anchor"),
+        ("#missing", "missing anchor"),
+        ("/blog/drafts/", "missing file"),
+    ],
+)
+def test_check_links_broken(href, reason):
+    pages = {
+        "index.html": ([href], ["intro"]),
+        "posts/a.html": ([], ["section"]),
+    }
+
+    assert check_links(BASE_URL, pages, OUTPUTS) == (
+        1,
+        [BrokenLink("index.html", href, reason)],
+    )
+
+
+def test_check_links_relative_to_page():
+    pages = {"posts/a.html": (["../index.html", "a.html", "c.html"], [])}
+
+    checked, broken = check_links(BASE_URL, pages, OUTPUTS)
+
+    assert checked == 3
+    assert broken == [BrokenLink("posts/a.html", "c.html", "missing file")]
+
+
+def test_write_link_report(tmp_path):
+    report_path = str(tmp_path / "reports" / "links.json")
+
+    write_link_report(
+        report_path, 2, [BrokenLink("index.html", "b.html", "missing file")]
+    )
+
+    with open(report_path) as fp:
+        assert json.load(fp) == {
+            "checked": 2,
+            "broken": [
+                {"page": "index.html", "href": "b.html", "reason": "missing file"}
+            ],
+        }
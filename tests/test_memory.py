@@ -0,0 +1,26 @@
+import pytest
+
+from web_maker.memory import MemoryGuard, MemoryLimitError, current_rss, parse_size
+
+
+@pytest.mark.parametrize(
+    "value,size",
+    [("1024", 1024), ("4K", 4096), ("512M", 512 * 1024 ** 2), ("2gib", 2 * 1024 ** 3)],
+)
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+
+@pytest.mark.parametrize("value", ["", "M", "1.5G", "10X", "-1"])
+def test_parse_size_invalid(value):
+    with pytest.raises(ValueError):
+        parse_size(value)
+
+
+@pytest.mark.skipif(current_rss() is None, reason="RSS can't be measured")
+def test_memory_guard():
+    MemoryGuard(None).check("content/index.md")
+    MemoryGuard(1024 ** 4).check("content/index.md")
+
+    with pytest.raises(MemoryLimitError):
+        MemoryGuard(1).check("content/index.md")
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from web_maker import osutils
+from web_maker.config import ConfigError
+from web_maker.outputs import (
+    clean_outputs,
+    load_manifest,
+    prune_outputs,
+    save_manifest,
+    source_paths,
+)
+
+
+@pytest.fixture
+def dist_dir(tmp_path):
+    dist_path = os.path.join(tmp_path, "dist")
+    for key in ("index.html", "posts/a.html", "posts/b.html", "old/c.html"):
+        file_path = os.path.join(dist_path, *key.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as fp:
+            fp.write(key)
+    yield dist_path
+
+
+def test_manifest_roundtrip(tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    assert load_manifest(cache_dir) is None
+
+    save_manifest(cache_dir, {"index.html", "posts/a.html"})
+    assert load_manifest(cache_dir) == {"index.html", "posts/a.html"}
+
+
+def test_prune_with_manifest(dist_dir):
+    outputs = {"index.html", "posts/a.html"}
+    # Files missing from the previous manifest are left alone.
+    previous = {"index.html", "posts/a.html", "old/c.html"}
+
+    pruned = prune_outputs(dist_dir, outputs, previous)
+
+    assert pruned == {"old/c.html"}
+    assert not os.path.exists(os.path.join(dist_dir, "old"))
+    assert os.path.exists(os.path.join(dist_dir, "posts", "b.html"))
+
+
+def test_prune_without_manifest(dist_dir):
+    outputs = {"index.html", "posts/a.html"}
+
+    pruned = prune_outputs(dist_dir, outputs)
+
+    assert pruned == {"posts/b.html", "old/c.html"}
+    assert os.path.exists(os.path.join(dist_dir, "posts", "a.html"))
+    assert not os.path.exists(os.path.join(dist_dir, "posts", "b.html"))
+
+
+def test_prune_outside_dist(dist_dir):
+    outside = os.path.join(os.path.dirname(dist_dir), "outside.html")
+    with open(outside, "w") as fp:
+        fp.write("")
+
+    prune_outputs(dist_dir, set(), {"../outside.html"})
+
+    assert os.path.exists(outside)
+
+
+@pytest.mark.parametrize("dist", [".", "site", "site/content"])
+def test_dist_path_contains_sources(tmp_path, dist):
+    project = tmp_path / "site"
+    (project / "content").mkdir(parents=True)
+    (project / "content" / "index.md").write_text("")
+    config = {"content_path": "content", "template_path": "templates"}
+
+    with osutils.cd(str(project)):
+        dist_path = os.path.join(str(tmp_path), dist)
+
+        with pytest.raises(ConfigError):
+            clean_outputs(dist_path, [], protected_paths=source_paths(config))
+        with pytest.raises(ConfigError):
+            prune_outputs(dist_path, set(), protected_paths=source_paths(config))
+
+    assert (project / "content" / "index.md").exists()
+
+
+def test_dist_path_inside_project(tmp_path):
+    config = {"content_path": "content", "template_path": "templates"}
+    (tmp_path / "dist").mkdir()
+
+    with osutils.cd(str(tmp_path)):
+        clean_outputs("dist", [], protected_paths=source_paths(config))
+
+    assert not (tmp_path / "dist").exists()
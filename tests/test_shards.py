@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from web_maker.outputs import load_manifest
+from web_maker.shards import (
+    ShardError,
+    merge_shards,
+    parse_shard,
+    select_shard,
+    shard_of,
+    write_shard_manifest,
+)
+from web_maker.writer import OutputWriter, WriteError
+
+
+@pytest.mark.parametrize("value,shard", [("1/1", (1, 1)), ("2/4", (2, 4))])
+def test_parse_shard(value, shard):
+    assert parse_shard(value) == shard
+
+
+@pytest.mark.parametrize("value", ["", "1", "0/4", "5/4", "1/0", "a/b", "1/2/3"])
+def test_parse_shard_invalid(value):
+    with pytest.raises(ShardError):
+        parse_shard(value)
+
+
+def test_shard_of_stable():
+    # The shard only depends on the path relative to the content directory.
+    assert shard_of("content", "content/posts/a.md", 4) == shard_of(
+        "site/content/", "site/content/posts/a.md", 4
+    )
+
+
+def test_select_shard_partition():
+    paths = ["content/posts/%d.md" % i for i in range(100)]
+    shards = [select_shard("content", paths, (i, 3)) for i in range(1, 4)]
+
+    assert sorted(sum(shards, [])) == sorted(paths)
+    assert all(shards)
+
+
+def write_shard(shard_dir, shard, outputs):
+    for key in outputs:
+        file_path = os.path.join(shard_dir, *key.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as fp:
+            fp.write(key)
+    write_shard_manifest(shard_dir, shard, outputs)
+
+
+def test_merge_shards(tmp_path):
+    shard_dirs = [os.path.join(tmp_path, "shard%d" % i) for i in (1, 2)]
+    write_shard(shard_dirs[0], (1, 2), ["index.html"])
+    write_shard(shard_dirs[1], (2, 2), ["posts/a.html"])
+
+    dist_path = os.path.join(tmp_path, "dist")
+    cache_path = os.path.join(tmp_path, "cache")
+    with OutputWriter() as writer:
+        merge_shards(shard_dirs, dist_path, cache_path, writer)
+
+    with open(os.path.join(dist_path, "posts", "a.html")) as fp:
+        assert fp.read() == "posts/a.html"
+    assert load_manifest(cache_path) == {"index.html", "posts/a.html"}
+
+
+@pytest.mark.parametrize(
+    "shards",
+    [
+        # Missing shard
+        [((1, 2), ["index.html"])],
+        # Conflicting outputs
+        [((1, 2), ["index.html"]), ((2, 2), ["index.html"])],
+        # Different shard counts
+        [((1, 2), ["index.html"]), ((2, 3), ["posts/a.html"])],
+        # Outputs outside the output directory
+        [((1, 2), ["index.html"]), ((2, 2), ["../index.html"])],
+        [((1, 2), ["index.html"]), ((2, 2), ["/etc/index.html"])],
+    ],
+)
+def test_merge_shards_invalid(tmp_path, shards):
+    shard_dirs = []
+    for i, (shard, outputs) in enumerate(shards):
+        shard_dirs.append(os.path.join(tmp_path, "shard%d" % i))
+        write_shard(shard_dirs[-1], shard, outputs)
+
+    with pytest.raises(ShardError):
+        with OutputWriter() as writer:
+            merge_shards(
+                shard_dirs,
+                os.path.join(tmp_path, "dist"),
+                os.path.join(tmp_path, "cache"),
+                writer,
+            )
+
+
+def test_merge_shards_copy_failed(tmp_path):
+    shard_dir = os.path.join(tmp_path, "shard1")
+    write_shard(shard_dir, (1, 1), ["index.html"])
+    os.remove(os.path.join(shard_dir, "index.html"))
+
+    cache_path = os.path.join(tmp_path, "cache")
+    with pytest.raises(WriteError):
+        with OutputWriter() as writer:
+            merge_shards(
+                [shard_dir], os.path.join(tmp_path, "dist"), cache_path, writer
+            )
+
+    # Outputs that failed to copy aren't recorded.
+    assert load_manifest(cache_path) is None
@@ -1,6 +1,9 @@
+import os
+
 import pytest
 
 import web_maker.template
+from web_maker.loader import PageLoader
 
 
 @pytest.fixture(scope="module")
@@ -31,3 +34,53 @@ def test_url_lookup(base_url, file_path, url):
     url_lookup = web_maker.template.create_url_lookup(base_url, dir_paths, ext_map)
     href = url_lookup(file_path)
     assert href == url
+
+
+def test_srcset():
+    url_lookup = web_maker.template.create_url_lookup(
+        "http://github.com", ["content/"], {"md": "html"}
+    )
+    srcset = web_maker.template.create_srcset(url_lookup, [640, 320])
+    assert srcset("content/images/photo.jpg") == (
+        "http://github.com/images/photo-320w.jpg 320w, "
+        "http://github.com/images/photo-640w.jpg 640w"
+    )
+
+
+@pytest.fixture
+def dated_content(tmp_path):
+    posts = {
+        "a": "published: 2020-03-01",
+        "b": "published: 2020-01-15T08:30:00",
+        "c": "published: '2020-02-01'",
+        "d": "title: Undated",
+    }
+    for name, meta in posts.items():
+        (tmp_path / (name + ".md")).write_text("---\n%s\n---\n" % meta)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize(
+    "kwargs,names",
+    [
+        ({"order_by": "published"}, ["b", "c", "a", "d"]),
+        ({"order_by": "-published"}, ["a", "c", "b", "d"]),
+        ({"order_by": "published", "since": "2020-02-01"}, ["c", "a"]),
+        ({"order_by": "published", "until": "2020-01-15"}, ["b"]),
+        ({"order_by": "published", "until": "2020-01-15T08:00:00"}, []),
+    ],
+)
+def test_list_pages_by_date(dated_content, kwargs, names):
+    list_pages = web_maker.template.create_list_pages(dated_content, PageLoader())
+    pages = list_pages("*.md", **kwargs)
+
+    assert [os.path.basename(page["file_path"])[0] for page in pages] == names
+
+
+def test_list_pages_by_date_invalid(dated_content):
+    list_pages = web_maker.template.create_list_pages(dated_content, PageLoader())
+
+    with pytest.raises(ValueError):
+        list(list_pages("*.md", order_by="title"))
+    with pytest.raises(ValueError):
+        list(list_pages("*.md", since="yesterday"))
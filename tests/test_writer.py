@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from web_maker.writer import OutputWriter, WriteError
+
+
+def test_writer_creates_directories(tmp_path):
+    paths = [
+        os.path.join(tmp_path, "index.html"),
+        os.path.join(tmp_path, "posts", "a.html"),
+        os.path.join(tmp_path, "posts", "b.html"),
+        os.path.join(tmp_path, "posts", "nested", "c.html"),
+    ]
+
+    with OutputWriter(max_workers=2, max_pending=1) as writer:
+        for path in paths:
+            writer.write(path, "<p>%s</p>" % os.path.basename(path))
+
+    for path in paths:
+        with open(path, encoding="utf-8") as fp:
+            assert fp.read() == "<p>%s</p>" % os.path.basename(path)
+
+
+def test_writer_bytes(tmp_path):
+    path = os.path.join(tmp_path, "data.bin")
+
+    with OutputWriter() as writer:
+        writer.write(path, b"\x00\x01")
+
+    with open(path, "rb") as fp:
+        assert fp.read() == b"\x00\x01"
+
+
+def test_writer_error(tmp_path):
+    # Parent of the target is a file, so the directory can't be created.
+    blocker = os.path.join(tmp_path, "blocker")
+    with open(blocker, "w") as fp:
+        fp.write("")
+
+    with pytest.raises(WriteError):
+        with OutputWriter() as writer:
+            writer.write(os.path.join(blocker, "index.html"), "")
+
+
+def test_writer_closed(tmp_path):
+    writer = OutputWriter()
+    writer.close()
+
+    with pytest.raises(WriteError):
+        writer.write(os.path.join(tmp_path, "index.html"), "")
+
+
+@pytest.mark.parametrize("max_workers,max_pending", [(0, 1), (1, 0)])
+def test_writer_invalid_input(max_workers, max_pending):
+    with pytest.raises(ValueError):
+        OutputWriter(max_workers=max_workers, max_pending=max_pending)
+
+
+def test_writer_copy(tmp_path):
+    source_path = os.path.join(tmp_path, "source.png")
+    with open(source_path, "wb") as fp:
+        fp.write(b"\x89PNG")
+
+    target_path = os.path.join(tmp_path, "dist", "images", "source.png")
+    with OutputWriter() as writer:
+        writer.copy(source_path, target_path)
+
+    with open(target_path, "rb") as fp:
+        assert fp.read() == b"\x89PNG"
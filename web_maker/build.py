@@ -2,20 +2,95 @@
 import contextlib
 import logging
 import os
-from time import monotonic_ns
+from time import monotonic_ns, perf_counter
+from typing import Dict, List, Optional, Tuple
 
-import rcssmin
 from bs4 import BeautifulSoup
-from jinja2 import Environment, FileSystemLoader
-from markdown import Markdown
+from jinja2 import Template
 
+from .compress import Compressor
+from .converters import create_converters
+from .deps import (
+    BuildState,
+    DependencyRecorder,
+    DependencyResolver,
+    build_key,
+    hash_bytes,
+)
+from .events import (
+    BUILD_FINISHED,
+    BUILD_STARTED,
+    CACHE_HIT,
+    CACHE_MISS,
+    PAGE_FINISHED,
+    PAGE_STARTED,
+    EventBus,
+)
+from .images import ImageProcessor, is_image
+from .index import PageIndex
+from .links import BrokenLink, check_links, extract_links, write_link_report
 from .loader import PageLoader
-from .template import create_model
-from .jinja import JinjaMarkdownExtension, IgnoreMetaExtension
+from .memory import MemoryGuard, format_size, peak_rss
+from .outputs import (
+    check_dist_path,
+    load_manifest,
+    output_key,
+    prune_outputs,
+    save_manifest,
+    source_paths,
+)
+from .shards import select_shard, write_shard_manifest
+from .template import create_model, match_pages
+from .jinja import create_template_env
 from .utils import replace_ext, subtract_prefix
+from .writer import OutputWriter
 
 
-def build_content(config: dict):
+# File name of the page index inside the cache directory.
+PAGE_INDEX = "pages.idx"
+
+
+def build_content(
+    config: dict,
+    prune: bool = False,
+    force: bool = False,
+    events: Optional[EventBus] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    strict: bool = False,
+    check_links: bool = False,
+    link_report: Optional[str] = None,
+    stream: bool = False,
+    max_memory: Optional[int] = None,
+) -> List[BrokenLink]:
+    """
+    Generate the site from the project's content and templates.
+
+    Pages whose source and template inputs are unchanged since the previous
+    build are skipped.
+
+    Args:
+        config: Project config dictionary.
+        prune: When True, output files that were not produced by this build,
+            such as pages generated from deleted content, are deleted.
+        force: When True, every page is rendered again.
+        events: Optional bus that receives structured build events.
+        shard: Optional ``(index, count)`` pair. When given, only the content
+            files in the shard are built, and a shard manifest is written to
+            the output directory for the merge step.
+        strict: When True, templates that use undefined variables fail the build.
+        check_links: When True, internal links of all pages are checked
+            after the build.
+        link_report: Optional file path the result of the link check is
+            written to, as JSON. Implies ``check_links``.
+        stream: When True, page contents are released as soon as each page
+            is written, and metadata is read from the page index, so memory
+            use stays flat however large the site is.
+        max_memory: Optional limit in bytes on the resident set size of the
+            process. The build fails when it's exceeded.
+
+    Returns:
+        Broken internal links, when links were checked.
+    """
     logger = logging.getLogger(__name__)
 
     with stopwatch():
@@ -24,78 +99,444 @@ def build_content(config: dict):
         # Ensure output directory exists
         logger.info("Output directory: %s", config["dist_path"])
 
-        # Cache of loaded content files
-        page_loader = PageLoader()
+        builder = SiteBuilder(
+            config,
+            force=force,
+            events=events,
+            shard=shard,
+            strict=strict,
+            stream=stream,
+            max_memory=max_memory,
+        )
+        builder.build(
+            prune=prune,
+            check_links=check_links or link_report is not None,
+            link_report=link_report,
+        )
+
+        logger.info("Done")
+
+    logger.info("Peak memory: %s", format_size(peak_rss()))
+
+    return builder.broken_links
+
+
+class SiteBuilder(object):
+    """
+    State of a single run of the content generator pipeline.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        force: bool = False,
+        events: Optional[EventBus] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        strict: bool = False,
+        stream: bool = False,
+        max_memory: Optional[int] = None,
+    ):
+        self.config = config
+        self.shard = shard
+        self.stream = stream
+        self.events = events if events is not None else EventBus()
+        self._logger = logging.getLogger(__name__)
+
+        # Cache of loaded content files. When streaming, only
+        # metadata is cached, until the page index is written.
+        self.page_loader = PageLoader(keep_bodies=not stream)
+        self.memory = MemoryGuard(max_memory)
+
+        # Inputs consumed by the page currently rendering.
+        self.recorder = DependencyRecorder()
+        self.resolver = DependencyResolver(
+            lambda pattern: match_pages(config["content_path"], pattern),
+            self.page_loader.get_meta,
+        )
 
         # Common context model passed to all templates.
-        model = create_model(config, page_loader)
+        self.model = create_model(config, self.page_loader, self.recorder)
 
         # Jinaj2 environment
-        template_env = Environment(loader=FileSystemLoader(config["template_path"]))
-        template_env.filters["cssmin"] = rcssmin.cssmin
-        template_env.filters["first"] = lambda seq: seq[0] if seq else ""
-
-        for root, _, files in os.walk(config["content_path"]):
-            logger.debug("Walking %s", root)
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                logger.info("Processing %s", filepath)
-
-                metadata = page_loader.get_meta(filepath)
-
-                # Build template scoped model.
-                template_model = {**model}
-                template_model["get_meta"] = lambda name: metadata.get(name)
-
-                file_bytes = page_loader.load_page(filepath)
-                file_str = file_bytes.decode("utf-8")
-
-                # FIXME: Move parser out of loop
-                md = Markdown(
-                    extensions=[
-                        "abbr",
-                        "admonition",
-                        "tables",
-                        "codehilite",
-                        "sane_lists",
-                        "footnotes",
-                        "toc",
-                        JinjaMarkdownExtension(template_env, template_model),
-                        IgnoreMetaExtension(),
-                    ]
-                )
-                content_html = md.convert(file_str)
+        self.template_env = create_template_env(config, strict=strict)
 
-                # Recreate sub-directory tree by lifting paths out of content folder
-                # and placing them in the root of the distribution folder.
-                target_dir = os.path.join(
-                    config["dist_path"], subtract_prefix(config["content_path"], root)
-                )
-                os.makedirs(target_dir, exist_ok=True)
-                target_filepath = os.path.join(
-                    target_dir, replace_ext(filename, "html")
+        # Content converters by file extension, each created once and reused.
+        self.converters = create_converters(self.template_env)
+
+        # Inputs recorded by the previous build, used to skip unchanged pages.
+        key = build_key(config, config["template_path"], strict=strict)
+        self.previous_state = (
+            BuildState(key) if force else BuildState.load(config["cache_path"], key)
+        )
+        self.manifest = load_manifest(config["cache_path"])
+        self.previous_outputs = self.manifest or set()
+        self.state = BuildState(key)
+
+        # Keys of every file produced by this build.
+        self.outputs = set()
+
+        # Layout templates, resolved once per build.
+        self._layouts: Dict[str, Template] = {}
+
+        # Writes compressed variants of text outputs.
+        self.compressor = (
+            Compressor(config["cache_path"], events=self.events)
+            if config["precompress"]
+            else None
+        )
+
+        # Result of the link check.
+        self.broken_links: List[BrokenLink] = []
+
+    def build(
+        self,
+        prune: bool = False,
+        check_links: bool = False,
+        link_report: Optional[str] = None,
+    ):
+        config = self.config
+        events = self.events
+        start = perf_counter()
+
+        if prune and self.shard is not None:
+            raise ValueError("Sharded builds can't prune outputs")
+
+        # Fail before building anything, rather than after rendering the site.
+        if prune:
+            check_dist_path(config["dist_path"], source_paths(config))
+
+        # A shard only knows its own outputs, so links to
+        # pages of other shards would all look broken.
+        if check_links and self.shard is not None:
+            raise ValueError("Sharded builds can't check links")
+
+        with events.stage("discover"):
+            page_paths, image_paths = discover_content(config["content_path"])
+
+        # Metadata of all pages, written once so worker processes can
+        # attach to it instead of loading every page again. Shards
+        # index every page, so list_pages sees the whole site.
+        with events.stage("index"):
+            os.makedirs(config["cache_path"], exist_ok=True)
+            PageIndex.write(
+                os.path.join(config["cache_path"], PAGE_INDEX),
+                (self._page_record(filepath) for filepath in page_paths),
+            )
+
+        if self.shard is not None:
+            page_paths = select_shard(config["content_path"], page_paths, self.shard)
+            image_paths = select_shard(config["content_path"], image_paths, self.shard)
+            self._logger.info(
+                "Building shard %d/%d: %d pages, %d images",
+                *self.shard,
+                len(page_paths),
+                len(image_paths),
+            )
+
+        events.emit(BUILD_STARTED, pages=len(page_paths), images=len(image_paths))
+
+        # Files are written in the background, so rendering
+        # doesn't stall on filesystem latency.
+        writer = OutputWriter(
+            max_workers=config["write_workers"],
+            max_pending=config["write_queue_size"],
+            events=events,
+            compressor=self.compressor,
+        )
+
+        # Resized image variants are generated on a process pool
+        # while pages render.
+        images = ImageProcessor(
+            config["cache_path"],
+            config["image_widths"],
+            config["image_workers"],
+            events=events,
+        )
+
+        with events.stage("render"):
+            with writer, images, self._stream_index():
+                for filepath in image_paths:
+                    self._build_image(filepath, writer, images)
+                    self.memory.check(filepath)
+
+                # Pages sharing a layout render back to back, so its compiled
+                # template and imported macros stay hot.
+                for filepath in self._order_by_layout(page_paths):
+                    self._build_page(filepath, writer)
+                    self.memory.check(filepath)
+
+                images.finish(writer)
+
+        if check_links:
+            with events.stage("links"):
+                self._check_links(page_paths, link_report)
+
+        if prune:
+            with events.stage("prune"):
+                pruned = prune_outputs(
+                    config["dist_path"],
+                    self.outputs,
+                    self.manifest,
+                    protected_paths=source_paths(config),
                 )
+            self._logger.info("Pruned %d stale files", len(pruned))
 
-                # Build page object
-                page = {
-                    "meta": {**metadata},
-                    "content": content_html,
-                    "file_location": filepath,
-                }
+            manifest = self.outputs
+        else:
+            # Outputs of removed sources stay in the manifest
+            # until a pruning build deletes them.
+            manifest = self.previous_outputs | self.outputs
 
-                with open(target_filepath, "w", encoding="utf-8") as fp:
-                    template_name = metadata["template"] or config["default_template"]
-                    logger.info("Load template '%s'", template_name)
-                    template = template_env.get_template(template_name)
-                    page_html = template.render(page=page, **template_model)
+        with events.stage("save"):
+            save_manifest(config["cache_path"], manifest)
+            self.state.save(config["cache_path"])
+            if self.compressor is not None:
+                self.compressor.save()
+            if self.shard is not None:
+                write_shard_manifest(config["dist_path"], self.shard, self.outputs)
 
-                    # Prettify html output
-                    soup = BeautifulSoup(page_html, features="html.parser")
+        events.emit(
+            BUILD_FINISHED, duration=perf_counter() - start, peak_rss=peak_rss()
+        )
 
-                    logger.debug("Writing %s", target_filepath)
-                    fp.write(soup.prettify())
+    @contextlib.contextmanager
+    def _stream_index(self):
+        """
+        When streaming, serve page metadata from the page index while pages
+        render, instead of keeping the metadata of every page in memory.
+        """
+        if not self.stream:
+            yield
+            return
 
-        logger.info("Done")
+        index = PageIndex.open(os.path.join(self.config["cache_path"], PAGE_INDEX))
+        self.page_loader.attach_index(index)
+        try:
+            yield
+        finally:
+            self.page_loader.attach_index(None)
+            index.close()
+
+    def _check_links(self, page_paths: List[str], link_report: Optional[str]):
+        """
+        Check the links recorded in the build state, which covers pages
+        that were skipped as well as those rendered by this build.
+        """
+        config = self.config
+
+        pages = {}
+        for filepath in page_paths:
+            entry = self.state.pages[os.path.normpath(filepath)]
+            if entry["ids"] is None:
+                continue
+            key = output_key(config["dist_path"], _target_path(config, filepath))
+            pages[key] = (entry["links"], entry["ids"])
+
+        checked, self.broken_links = check_links(
+            config["html_base_url"], pages, self.outputs
+        )
+
+        for link in self.broken_links:
+            self._logger.warning(
+                "Broken link in %s: %s (%s)", link.page, link.href, link.reason
+            )
+        self._logger.info(
+            "Checked %d links, %d broken", checked, len(self.broken_links)
+        )
+
+        if link_report is not None:
+            write_link_report(link_report, checked, self.broken_links)
+
+    def _layout_name(self, filepath: str) -> str:
+        """Name of the template that the page is rendered into."""
+        metadata = self.page_loader.get_meta(filepath)
+        return metadata["template"] or self.config["default_template"]
+
+    def _order_by_layout(self, page_paths: List[str]) -> List[str]:
+        """
+        Group pages by their layout template. Within a group, pages keep
+        the order they were discovered in.
+        """
+        return sorted(page_paths, key=self._layout_name)
+
+    def _get_layout(self, template_name: str) -> Template:
+        template = self._layouts.get(template_name)
+        if template is None:
+            self._logger.debug("Load template '%s'", template_name)
+            template = self.template_env.get_template(template_name)
+            self._layouts[template_name] = template
+        return template
+
+    def _page_record(self, filepath: str) -> dict:
+        """Page index record of the given content file."""
+        return {
+            "file_path": filepath,
+            "meta": self.page_loader.get_meta(filepath),
+            "sort_keys": self.page_loader.get_sort_keys(filepath),
+            "output": output_key(
+                self.config["dist_path"], _target_path(self.config, filepath)
+            ),
+            "url": self.model["url"](filepath),
+        }
+
+    def _is_fresh(self, state_path: str, source_hash: str, target_paths) -> bool:
+        """
+        Check whether the outputs generated from a source file can be kept
+        from the previous build.
+        """
+        dist_path = self.config["dist_path"]
+        return (
+            all(
+                output_key(dist_path, target) in self.previous_outputs
+                for target in target_paths
+            )
+            and self.previous_state.is_fresh(state_path, source_hash, self.resolver)
+            and all(os.path.exists(target) for target in target_paths)
+        )
+
+    def _build_image(self, filepath: str, writer: OutputWriter, images):
+        config = self.config
+
+        # Images keep their file name
+        target_filepath = _target_path(config, filepath, ext=None)
+        target_paths = [
+            target_filepath,
+            *images.variant_targets(target_filepath).values(),
+        ]
+        for target in target_paths:
+            self.outputs.add(output_key(config["dist_path"], target))
+
+        with open(filepath, "rb") as fp:
+            source_hash = hash_bytes(fp.read())
+        state_path = os.path.normpath(filepath)
+
+        if self._is_fresh(state_path, source_hash, target_paths):
+            self._logger.debug("Up to date %s", filepath)
+            self.events.emit(CACHE_HIT, cache="build", path=filepath)
+            self.state.carry(self.previous_state, state_path)
+            return
+
+        self._logger.debug("Processing %s", filepath)
+        self.events.emit(CACHE_MISS, cache="build", path=filepath)
+        images.submit(filepath, source_hash, target_filepath, writer)
+
+        # Images have no dependencies besides their own contents.
+        self.state.record(state_path, source_hash, DependencyRecorder(), self.resolver)
+
+    def _build_page(self, filepath: str, writer: OutputWriter):
+        config = self.config
+
+        # The writer creates the target directory when the file is written.
+        target_filepath = _target_path(config, filepath)
+        target_paths = [target_filepath]
+        if self.compressor is not None:
+            target_paths += self.compressor.sibling_paths(target_filepath)
+        for target in target_paths:
+            self.outputs.add(output_key(config["dist_path"], target))
+
+        file_bytes = self.page_loader.load_page(filepath)
+        source_hash = hash_bytes(file_bytes)
+        state_path = os.path.normpath(filepath)
+
+        if self._is_fresh(state_path, source_hash, target_paths):
+            self._logger.debug("Up to date %s", filepath)
+            self.events.emit(CACHE_HIT, cache="build", path=filepath)
+            self.state.carry(self.previous_state, state_path)
+            return
+
+        self._logger.debug("Processing %s", filepath)
+        self.events.emit(CACHE_MISS, cache="build", path=filepath)
+        self.events.emit(PAGE_STARTED, path=filepath)
+        start = perf_counter()
+        self.recorder.reset()
+
+        converter = self.converters.get(filepath)
+
+        if not converter.layout:
+            # Written without a layout. The file isn't parsed, so it
+            # has no recorded ids, and its links aren't checked.
+            writer.write(
+                target_filepath, converter.convert(file_bytes.decode("utf-8"), {})
+            )
+            self.state.record(
+                state_path, source_hash, self.recorder, self.resolver, ids=None
+            )
+            self.events.emit(
+                PAGE_FINISHED, path=filepath, duration=perf_counter() - start
+            )
+            return
+
+        metadata = self.page_loader.get_meta(filepath)
+
+        # Build template scoped model.
+        template_model = {**self.model}
+        template_model["get_meta"] = lambda name: metadata.get(name)
+
+        file_str = file_bytes.decode("utf-8")
+        content_html = converter.convert(file_str, template_model)
+
+        # Build page object
+        page = {
+            "meta": {**metadata},
+            "content": content_html,
+            "file_location": filepath,
+        }
+
+        template = self._get_layout(
+            metadata["template"] or config["default_template"]
+        )
+        page_html = template.render(page=page, **template_model)
+
+        # Prettify html output
+        soup = BeautifulSoup(page_html, features="html.parser")
+
+        # Links are collected on every build, so pages skipped by
+        # later builds still have them for the link check.
+        links, ids = extract_links(soup)
+
+        writer.write(target_filepath, soup.prettify())
+        self.state.record(
+            state_path, source_hash, self.recorder, self.resolver, links, ids
+        )
+
+        self.events.emit(PAGE_FINISHED, path=filepath, duration=perf_counter() - start)
+
+
+def discover_content(content_path: str) -> Tuple[List[str], List[str]]:
+    """
+    Walk the content directory, and return the paths of all content files,
+    split into pages and images.
+    """
+    logger = logging.getLogger(__name__)
+    page_paths = []
+    image_paths = []
+
+    for root, _, files in os.walk(content_path):
+        logger.debug("Walking %s", root)
+        for filename in files:
+            filepath = os.path.join(root, filename)
+            if is_image(filepath):
+                image_paths.append(filepath)
+            else:
+                page_paths.append(filepath)
+
+    return page_paths, image_paths
+
+
+def _target_path(config: dict, filepath: str, ext: Optional[str] = "html") -> str:
+    """
+    Path of the file generated from the given content file. The file
+    extension is replaced with the given one, unless it is None.
+    """
+    # Recreate sub-directory tree by lifting paths out of content folder
+    # and placing them in the root of the distribution folder.
+    root, filename = os.path.split(filepath)
+    target_dir = os.path.join(
+        config["dist_path"], subtract_prefix(config["content_path"], root)
+    )
+    if ext is not None:
+        filename = replace_ext(filename, ext)
+    return os.path.join(target_dir, filename)
 
 
 @contextlib.contextmanager
@@ -0,0 +1,254 @@
+"""
+Static checks of templates and content, without building the site.
+
+Every template and content page is parsed by Jinja2 once, and the syntax
+trees are inspected for:
+
+* Syntax errors.
+* Variables that are neither defined by the template nor passed in by the build.
+* Templates that don't exist, referenced through ``extends``, ``include``,
+  ``import`` or the ``template:`` field of a page's front matter.
+* Content formats that can't be converted, like reStructuredText without
+  docutils installed.
+* Fields of ``page.meta`` that aren't built-in metadata fields.
+* ``url()`` calls with a constant path to a file that doesn't exist.
+
+Nothing is rendered, and Markdown isn't converted, so checking takes a small
+fraction of the time of a full build.
+"""
+import os
+from typing import Iterator, List, NamedTuple, Optional, Set
+
+from jinja2 import Environment, TemplateSyntaxError, meta, nodes
+
+from .build import discover_content
+from .converters import ConverterError, ConverterRegistry, create_converters
+from .jinja import IgnoreMetaProcessor, create_template_env
+from .loader import BuiltinMetaSchema, PageLoader, PageLoadError
+from .template import create_model
+
+
+class Problem(NamedTuple):
+    file_path: str
+    line: Optional[int]
+    message: str
+
+    def __str__(self):
+        if self.line is None:
+            return "%s: %s" % (self.file_path, self.message)
+        return "%s:%d: %s" % (self.file_path, self.line, self.message)
+
+
+def check_site(config: dict) -> List[Problem]:
+    """
+    Check all templates and content pages of the project.
+
+    Returns:
+        Problems found, ordered by file.
+    """
+    template_env = create_template_env(config)
+    page_loader = PageLoader()
+    model = create_model(config, page_loader)
+
+    # Names passed to every template by the build.
+    known = set(model) | set(template_env.globals) | {"get_meta"}
+    meta_fields = set(BuiltinMetaSchema._declared_fields)
+    templates = set(template_env.list_templates())
+
+    problems = []
+
+    for template_name in sorted(templates):
+        file_path = os.path.join(config["template_path"], template_name)
+        source, _, _ = template_env.loader.get_source(template_env, template_name)
+
+        # Layouts are rendered with the page object.
+        problems += _check_source(
+            template_env, file_path, source, 0, known | {"page"}, meta_fields, templates
+        )
+
+    converters = create_converters(template_env)
+
+    page_paths, _ = discover_content(config["content_path"])
+    for file_path in sorted(page_paths):
+        problems += _check_page(
+            template_env,
+            page_loader,
+            converters,
+            config,
+            file_path,
+            known,
+            meta_fields,
+            templates,
+        )
+
+    return problems
+
+
+def _check_page(
+    template_env: Environment,
+    page_loader: PageLoader,
+    converters: ConverterRegistry,
+    config: dict,
+    file_path: str,
+    known: Set[str],
+    meta_fields: Set[str],
+    templates: Set[str],
+) -> List[Problem]:
+    try:
+        converter = converters.get(file_path)
+        metadata = page_loader.get_meta(file_path)
+        source = page_loader.load_page(file_path).decode("utf-8")
+    except (ConverterError, PageLoadError, UnicodeDecodeError) as err:
+        return [Problem(file_path, None, str(err))]
+
+    # Files copied as they are use neither a layout nor Jinja2.
+    if not converter.layout:
+        return []
+
+    problems = []
+
+    template_name = metadata["template"] or config["default_template"]
+    if template_name not in templates:
+        problems.append(
+            Problem(file_path, None, "template '%s' does not exist" % template_name)
+        )
+
+    if not converter.jinja:
+        return problems
+
+    # The front matter isn't part of the Jinja source, so line numbers
+    # reported by Jinja are shifted by its length.
+    lines = source.split("\n")
+    content_lines = IgnoreMetaProcessor(None).run(lines)
+    offset = len(lines) - len(content_lines)
+
+    problems += _check_source(
+        template_env,
+        file_path,
+        "\n".join(content_lines),
+        offset,
+        known,
+        meta_fields,
+        templates,
+    )
+
+    return problems
+
+
+def _check_source(
+    template_env: Environment,
+    file_path: str,
+    source: str,
+    line_offset: int,
+    known: Set[str],
+    meta_fields: Set[str],
+    templates: Set[str],
+) -> List[Problem]:
+    try:
+        ast = template_env.parse(source)
+    except TemplateSyntaxError as err:
+        return [Problem(file_path, err.lineno + line_offset, err.message)]
+
+    problems = []
+
+    # find_undeclared_variables doesn't report line numbers,
+    # so they're looked up from the first use of each name.
+    undeclared = meta.find_undeclared_variables(ast) - known
+    first_use = {}
+    for node in ast.find_all(nodes.Name):
+        if node.name in undeclared and node.name not in first_use:
+            first_use[node.name] = node.lineno
+    for name in sorted(undeclared, key=lambda n: (first_use.get(n, 0), n)):
+        problems.append(
+            Problem(
+                file_path,
+                first_use.get(name, 1) + line_offset,
+                "undefined variable '%s'" % name,
+            )
+        )
+
+    template_nodes = (nodes.Extends, nodes.Include, nodes.Import, nodes.FromImport)
+    for node in ast.find_all(template_nodes):
+        if isinstance(node.template, nodes.Const):
+            name = node.template.value
+            if isinstance(name, str) and name not in templates:
+                problems.append(
+                    Problem(
+                        file_path,
+                        node.lineno + line_offset,
+                        "template '%s' does not exist" % name,
+                    )
+                )
+
+    for node, field in _meta_fields(ast):
+        if field not in meta_fields:
+            problems.append(
+                Problem(
+                    file_path,
+                    node.lineno + line_offset,
+                    "unknown metadata field '%s'" % field,
+                )
+            )
+
+    for node in ast.find_all(nodes.Call):
+        target = _url_target(node)
+        if target is not None and not os.path.exists(target):
+            problems.append(
+                Problem(
+                    file_path,
+                    node.lineno + line_offset,
+                    "url target '%s' does not exist" % target,
+                )
+            )
+
+    return problems
+
+
+def _meta_fields(ast: nodes.Template) -> Iterator[tuple]:
+    """
+    Find reads of metadata fields, through ``page.meta.<field>``, and
+    ``<item>.meta.<field>`` for loop variables over ``list_pages``.
+    """
+    page_names = {"page"}
+    for node in ast.find_all(nodes.For):
+        if (
+            isinstance(node.target, nodes.Name)
+            and isinstance(node.iter, nodes.Call)
+            and isinstance(node.iter.node, nodes.Name)
+            and node.iter.node.name == "list_pages"
+        ):
+            page_names.add(node.target.name)
+
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        field = _attr_name(node)
+        parent = node.node
+        if (
+            field is not None
+            and isinstance(parent, (nodes.Getattr, nodes.Getitem))
+            and _attr_name(parent) == "meta"
+            and isinstance(parent.node, nodes.Name)
+            and parent.node.name in page_names
+        ):
+            yield node, field
+
+
+def _attr_name(node) -> Optional[str]:
+    if isinstance(node, nodes.Getattr):
+        return node.attr
+    if isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+        if isinstance(node.arg.value, str):
+            return node.arg.value
+    return None
+
+
+def _url_target(node: nodes.Call) -> Optional[str]:
+    """Path passed to ``url()``, when it is a constant."""
+    if (
+        isinstance(node.node, nodes.Name)
+        and node.node.name == "url"
+        and len(node.args) == 1
+        and isinstance(node.args[0], nodes.Const)
+        and isinstance(node.args[0].value, str)
+    ):
+        return node.args[0].value
+    return None
@@ -1,13 +1,18 @@
-"""Command line interface."""
+"""
+Command line interface.
+
+The build pipeline pulls in Markdown, Jinja2, BeautifulSoup and friends, so
+those modules are imported inside the commands that need them. Commands like
+``--help`` and ``clean`` start without paying for them.
+"""
 from functools import wraps
 import logging
 import os
-import click
+from typing import Optional, Tuple
 
-from web_maker.project import init_project
+import click
 
-from .build import build_content
-from .config import load_config, setup_logging
+from .config import CACHE_DIR, ConfigError, load_config, setup_logging
 
 
 class StdCommand(click.Command):
@@ -40,6 +45,32 @@ def inject_logger(func):
     return inner
 
 
+def _parse_shard(ctx, param, value):
+    """Click callback converting ``--shard index/count`` into a tuple."""
+    from .shards import ShardError, parse_shard
+
+    if value is None:
+        return None
+
+    try:
+        return parse_shard(value)
+    except ShardError as err:
+        raise click.BadParameter(str(err))
+
+
+def _parse_size(ctx, param, value):
+    """Click callback converting sizes like ``512M`` into bytes."""
+    from .memory import parse_size
+
+    if value is None:
+        return None
+
+    try:
+        return parse_size(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err))
+
+
 @click.group()
 def main():
     pass
@@ -51,6 +82,8 @@ def init(logger: logging.Logger):
     """
     Creates a new project in the current working directory.
     """
+    from .project import init_project
+
     project_dir = os.path.abspath(os.curdir)
 
     # Directory must be empty
@@ -67,20 +100,192 @@ def init(logger: logging.Logger):
 
 
 @main.command(cls=StdCommand)
+@click.option(
+    "--prune",
+    is_flag=True,
+    help="Delete output files left over from content that no longer exists",
+)
+@click.option("--force", is_flag=True, help="Render every page, even when unchanged")
+@click.option(
+    "--events",
+    "events_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write structured build events to a file, as JSON lines",
+)
+@click.option(
+    "--metrics",
+    "metrics_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write build metrics to a file, in the Prometheus text format",
+)
+@click.option("--progress", is_flag=True, help="Show a progress bar")
+@click.option(
+    "--shard",
+    metavar="INDEX/COUNT",
+    callback=_parse_shard,
+    help="Only build one shard of the site, like 1/4. Combine shards with merge.",
+)
+@click.option(
+    "--strict", is_flag=True, help="Fail on templates that use undefined variables"
+)
+@click.option(
+    "--check-links",
+    is_flag=True,
+    help="Check internal links and fail when any are broken",
+)
+@click.option(
+    "--link-report",
+    "link_report_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the result of the link check to a file, as JSON. Implies --check-links",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Release each page's contents once written, to keep memory use flat",
+)
+@click.option(
+    "--max-memory",
+    metavar="SIZE",
+    callback=_parse_size,
+    help="Fail the build when it uses more memory than this, like 512M or 2G",
+)
 @inject_logger
-def build(logger: logging.Logger):
+def build(
+    prune: bool,
+    force: bool,
+    events_path: str,
+    metrics_path: str,
+    progress: bool,
+    shard: Optional[Tuple[int, int]],
+    strict: bool,
+    check_links: bool,
+    link_report_path: Optional[str],
+    stream: bool,
+    max_memory: Optional[int],
+    logger: logging.Logger,
+):
     """
     Generates the site.
     """
-    config = load_config(".")
+    from jinja2 import UndefinedError
+    from .build import build_content
+    from .converters import ConverterError
+    from .images import ImageError
+    from .memory import MemoryLimitError
+    from .events import (
+        EventBus,
+        JsonLinesSink,
+        LogSummarySink,
+        MetricsSink,
+        ProgressSink,
+    )
+
+    if prune and shard:
+        raise click.UsageError("--prune can't be combined with --shard")
+
+    check_links = check_links or link_report_path is not None
+    if check_links and shard:
+        raise click.UsageError("Links can't be checked with --shard")
+
+    config = load_config(".", use_cache=True)
     logger.debug(config)
 
-    build_content(config)
+    # Progress is shown as a bar, or logged as periodic summaries. Per-file
+    # messages are logged at debug level, with --verbose.
+    sinks = [ProgressSink()] if progress else [LogSummarySink()]
+    if events_path:
+        sinks.append(JsonLinesSink(events_path))
+    if metrics_path:
+        sinks.append(MetricsSink(metrics_path))
 
+    try:
+        with EventBus(sinks) as events:
+            broken_links = build_content(
+                config,
+                prune=prune,
+                force=force,
+                events=events,
+                shard=shard,
+                strict=strict,
+                check_links=check_links,
+                link_report=link_report_path,
+                stream=stream,
+                max_memory=max_memory,
+            )
+    except (ConfigError, ConverterError, ImageError, MemoryLimitError) as err:
+        logger.error("Build failed: %s", err)
+        exit(1)
+    except UndefinedError as err:
+        logger.error("Build failed, undefined variable: %s", err)
+        exit(1)
 
-@main.command()
-def clean():
+    if broken_links:
+        logger.error("Found %d broken links", len(broken_links))
+        exit(1)
+
+
+@main.command(cls=StdCommand)
+@inject_logger
+def check(logger: logging.Logger):
     """
-    Deletes the output directory.
+    Checks templates and content for errors, without building the site.
     """
-    click.echo("Clean")
+    from .check import check_site
+
+    config = load_config(".", use_cache=True)
+
+    problems = check_site(config)
+    for problem in problems:
+        click.echo(str(problem))
+
+    if problems:
+        logger.error("Found %d problems", len(problems))
+        exit(1)
+
+    logger.info("No problems found")
+
+
+@main.command(cls=StdCommand)
+@click.argument(
+    "shard_dirs", nargs=-1, required=True, type=click.Path(exists=True, file_okay=False)
+)
+@inject_logger
+def merge(shard_dirs: Tuple[str, ...], logger: logging.Logger):
+    """
+    Combines the output directories of sharded builds into the output directory.
+    """
+    from .shards import ShardError, merge_shards
+    from .writer import OutputWriter, WriteError
+
+    config = load_config(".", use_cache=True)
+
+    try:
+        with OutputWriter(
+            max_workers=config["write_workers"], max_pending=config["write_queue_size"]
+        ) as writer:
+            merge_shards(shard_dirs, config["dist_path"], config["cache_path"], writer)
+    except (ShardError, WriteError) as err:
+        logger.error("Failed to merge shards: %s", err)
+        exit(1)
+
+
+@main.command(cls=StdCommand)
+@inject_logger
+def clean(logger: logging.Logger):
+    """
+    Deletes the output and cache directories.
+    """
+    from .outputs import clean_outputs, source_paths
+
+    config = load_config(".", use_cache=True)
+
+    try:
+        clean_outputs(
+            config["dist_path"],
+            {config["cache_path"], CACHE_DIR},
+            protected_paths=source_paths(config, "."),
+        )
+    except ConfigError as err:
+        logger.error("Failed to clean: %s", err)
+        exit(1)
@@ -0,0 +1,126 @@
+"""
+Precompressed variants of text output files.
+
+Web servers can serve a ``.gz`` or ``.br`` file next to the requested one,
+instead of compressing responses on the fly. When enabled, the writer
+compresses HTML, CSS and JavaScript files on its worker threads right after
+writing them, while the data is still in memory. Both zlib and brotli release
+the GIL, so files compress in parallel.
+
+Gzip is always available. Brotli variants are only generated when the
+optional ``brotli`` package is installed.
+
+The hash of each compressed file is kept in the cache directory. When a page
+is rendered again but its output didn't change, its variants are kept.
+"""
+import gzip
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from . import osutils
+from .deps import hash_bytes
+from .events import CACHE_HIT, CACHE_MISS, EventBus
+from .utils import extract_ext
+
+
+# File extensions of outputs that are compressed.
+COMPRESS_EXTENSIONS = frozenset(("html", "css", "js"))
+
+# File name of the hashes of compressed files inside the cache directory.
+COMPRESSED_HASHES = "compressed.json"
+
+
+def gzip_compress(data: bytes) -> bytes:
+    # A fixed timestamp keeps the output identical across builds.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data: bytes) -> bytes:
+    brotli = importlib.import_module("brotli")
+    return brotli.compress(data, quality=11)
+
+
+def available_encodings() -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    """File name suffixes and compression functions that can be used."""
+    encodings = [("gz", gzip_compress)]
+    if importlib.util.find_spec("brotli") is not None:
+        encodings.append(("br", brotli_compress))
+    return encodings
+
+
+class Compressor(object):
+    """
+    Writes compressed siblings of output files. Called concurrently
+    from the writer threads.
+    """
+
+    def __init__(self, cache_path: str, events: EventBus = None):
+        self._cache_path = cache_path
+        self._encodings = available_encodings()
+        self._hashes = self._load_hashes()
+        self._lock = threading.Lock()
+        self._events = events if events is not None else EventBus()
+        self._logger = logging.getLogger(__name__)
+
+    def accepts(self, file_path: str) -> bool:
+        ext = extract_ext(os.path.basename(file_path))
+        return ext is not None and ext.lower() in COMPRESS_EXTENSIONS
+
+    def sibling_paths(self, file_path: str) -> List[str]:
+        """Paths of the compressed variants of the given output file."""
+        if not self.accepts(file_path):
+            return []
+        return ["%s.%s" % (file_path, suffix) for suffix, _ in self._encodings]
+
+    def compress(self, file_path: str, data: bytes) -> List[Tuple[str, int]]:
+        """
+        Write the compressed variants of a file that was just written.
+
+        Returns:
+            Paths and sizes of the variants written, which is empty when
+            the data is unchanged since the variants were last written.
+        """
+        data_hash = hash_bytes(data)
+
+        with self._lock:
+            unchanged = self._hashes.get(file_path) == data_hash
+        siblings = self.sibling_paths(file_path)
+        if unchanged and all(os.path.exists(path) for path in siblings):
+            self._events.emit(CACHE_HIT, cache="compress", path=file_path)
+            return []
+
+        self._events.emit(CACHE_MISS, cache="compress", path=file_path)
+
+        written = []
+        for suffix, compress in self._encodings:
+            sibling_path = "%s.%s" % (file_path, suffix)
+            compressed = compress(data)
+            self._logger.debug("Compressing %s", sibling_path)
+            osutils.write_atomic(sibling_path, compressed)
+            written.append((sibling_path, len(compressed)))
+
+        with self._lock:
+            self._hashes[file_path] = data_hash
+
+        return written
+
+    def save(self):
+        os.makedirs(self._cache_path, exist_ok=True)
+        with self._lock:
+            data = json.dumps(self._hashes, sort_keys=True)
+        osutils.write_atomic(
+            os.path.join(self._cache_path, COMPRESSED_HASHES), data.encode("utf-8")
+        )
+
+    def _load_hashes(self) -> Dict[str, str]:
+        try:
+            file_path = os.path.join(self._cache_path, COMPRESSED_HASHES)
+            with open(file_path, encoding="utf-8") as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
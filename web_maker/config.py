@@ -1,30 +1,23 @@
 """
 Website project configuration.
 """
+import hashlib
+import json
 import logging
 import os
 import typing as T
 
-from marshmallow import fields, Schema, ValidationError, EXCLUDE
-
 from .utils import format_validation_errors
 from . import osutils
 
 
-class ConfigSchema(Schema):
-    site_name = fields.String(missing="website")
-    content_path = fields.String(required=True)
-    template_path = fields.String(required=True)
-    dist_path = fields.String(required=True)
-    default_template = fields.String(required=True)
+# Directory inside the project where build caches are kept.
+CACHE_DIR = ".web-maker"
 
-    # HTML
-    html_base_url = fields.Url(required=True)
-    html_language = fields.String(missing="en-gb")
-    html_charset = fields.String(missing="UTF-8")
+# File name of the validated config snapshot inside the cache directory.
+CONFIG_SNAPSHOT = "config.json"
 
-    class Meta:
-        unknown = EXCLUDE
+_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.py")
 
 
 class ConfigError(Exception):
@@ -35,9 +28,44 @@ class ConfigError(Exception):
     pass
 
 
-def load_config(dir_path: str, filename="conf.py") -> dict:
-    """Load project configuration from the given directory path."""
-    namespace = _eval_config(filename, dir_path)
+def load_config(dir_path: str, filename="conf.py", use_cache=False) -> dict:
+    """
+    Load project configuration from the given directory path.
+
+    Args:
+        dir_path: Project directory containing the config file.
+        filename: Name of the config file.
+        use_cache: When True, a validated snapshot of the config is kept in
+            the project's cache directory, keyed by the hash of the config file
+            contents. While the file is unchanged, the snapshot is returned
+            without executing or validating the config again. Config files that
+            read environment variables or other files should not be cached, and
+            can opt out by setting ``config_cache = False``.
+
+    Raises:
+        ConfigError: When the config file fails to execute or validate.
+    """
+    file_path = os.path.join(dir_path, filename)
+    try:
+        with open(file_path, "rb") as fp:
+            conf_source = fp.read()
+    except OSError as exc:
+        raise ConfigError(f"Failed to read config file {file_path}") from exc
+
+    snapshot_path = os.path.join(dir_path, CACHE_DIR, CONFIG_SNAPSHOT)
+    snapshot_key = _snapshot_key(conf_source)
+
+    if use_cache:
+        config = _read_snapshot(snapshot_path, snapshot_key)
+        if config is not None:
+            return config
+
+    # Marshmallow is slow to import, so it is
+    # only loaded when the config must be validated.
+    from marshmallow import ValidationError
+    from .schema import ConfigSchema
+
+    namespace = _eval_config(filename, dir_path, conf_source.decode("utf-8"))
 
     try:
         config = ConfigSchema().load(namespace)
@@ -46,10 +74,14 @@ def load_config(dir_path: str, filename="conf.py") -> dict:
         errors = format_validation_errors(exc.normalized_messages())
         raise ConfigError(f"Config file has invalid fields: \n{errors}") from exc
 
+    # Without a snapshot, the config file is executed on every load.
+    if use_cache and config["config_cache"]:
+        _write_snapshot(snapshot_path, snapshot_key, config)
+
     return config
 
 
-def _eval_config(filename: str, dir_path: str) -> dict:
+def _eval_config(filename: str, dir_path: str, conf_source: str = None) -> dict:
     """Load config file by executing it as a Python program."""
     # Values are extracted from the config file/program by
     # passing in a dictionary as the module globals.
@@ -61,9 +93,10 @@ def _eval_config(filename: str, dir_path: str) -> dict:
     # relative to itself.
     with osutils.cd(os.path.abspath(dir_path)):
         try:
-            with open(filename, "r", encoding="utf-8") as fp:
-                conf_source = fp.read()
-                exec(conf_source, namespace)
+            if conf_source is None:
+                with open(filename, "r", encoding="utf-8") as fp:
+                    conf_source = fp.read()
+            exec(conf_source, namespace)
         except SystemExit as exc:
             msg = "Config file or one of its imports called sys.exit()"
             raise ConfigError(msg) from exc
@@ -71,6 +104,48 @@ def _eval_config(filename: str, dir_path: str) -> dict:
     return namespace
 
 
+def _snapshot_key(conf_source: bytes) -> str:
+    """
+    Key identifying a config snapshot. Includes the source of the schema
+    module, so snapshots validated by a different schema are ignored.
+    """
+    digest = hashlib.sha256(conf_source)
+    with open(_SCHEMA_PATH, "rb") as fp:
+        digest.update(fp.read())
+    return digest.hexdigest()
+
+
+def _read_snapshot(snapshot_path: str, key: str) -> T.Optional[dict]:
+    logger = logging.getLogger(__name__)
+
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as fp:
+            snapshot = json.load(fp)
+    except (OSError, ValueError):
+        logger.debug("Config snapshot miss %s", snapshot_path)
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("key") != key:
+        logger.debug("Config snapshot stale %s", snapshot_path)
+        return None
+
+    return snapshot.get("config")
+
+
+def _write_snapshot(snapshot_path: str, key: str, config: dict):
+    logger = logging.getLogger(__name__)
+
+    try:
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        osutils.write_atomic(
+            snapshot_path, json.dumps({"key": key, "config": config}).encode("utf-8")
+        )
+    except (OSError, TypeError) as exc:
+        # Snapshot is only an optimisation; a failure to
+        # write it must not fail the command.
+        logger.debug("Failed to write config snapshot: %s", exc)
+
+
 def setup_logging(verbose: bool = False):
     if verbose:
         level = logging.DEBUG
@@ -0,0 +1,250 @@
+"""
+Converters of content files into HTML, by file extension.
+
+Each converter is created the first time a file of its format is built, and
+reused for every following file, so parsers with expensive setup, like
+Markdown with its extensions, are only set up once per process.
+
+Formats differ in how much of the pipeline they go through:
+
+* Markdown and reStructuredText are Jinja2 templates first, then converted,
+  then rendered into the page's layout template.
+* Jupyter notebooks exported to HTML, with names ending in ``.nb.html``,
+  skip Jinja2 and conversion. The body of the export is rendered into the
+  layout.
+* Plain HTML files are copied to the output as they are, apart from their
+  metadata section.
+
+Files with extensions that no converter is registered for are treated as
+Markdown.
+
+reStructuredText requires docutils, which is an optional dependency.
+"""
+import importlib.util
+from typing import Callable, Dict, Optional
+
+from bs4 import BeautifulSoup
+from jinja2 import Environment
+from markdown import Markdown
+
+from .jinja import IgnoreMetaExtension, IgnoreMetaProcessor, JinjaMarkdownExtension
+
+
+# Extensions of the Python Markdown package enabled for Markdown content.
+MARKDOWN_EXTENSIONS = (
+    "abbr",
+    "admonition",
+    "tables",
+    "codehilite",
+    "sane_lists",
+    "footnotes",
+    "toc",
+)
+
+
+# Extensions of the built-in content formats, mapped to the extension of
+# their output. Used by templates to turn content paths into page URLs.
+OUTPUT_EXTENSIONS = {"md": "html", "markdown": "html", "rst": "html", "htm": "html"}
+
+
+class ConverterError(Exception):
+    """
+    Errors raised while converting content files.
+    """
+
+    pass
+
+
+class Converter(object):
+    """
+    Converts the text of a content file into the HTML page content.
+    """
+
+    # When True, the text is rendered as a Jinja2 template before conversion.
+    jinja = True
+
+    # When True, the converted content is rendered into the layout template.
+    # Otherwise the converted content is written to the output as it is.
+    layout = True
+
+    def convert(self, text: str, model: dict) -> str:
+        """
+        :param text: Contents of the file, including the metadata section.
+        :param model: Template model of the page.
+        :raise ConverterError: When the text can't be converted.
+        """
+        raise NotImplementedError()
+
+
+class MarkdownConverter(Converter):
+    """
+    Converts Markdown, reusing a single parser for every file.
+    """
+
+    def __init__(self, template_env: Environment):
+        # The Jinja2 preprocessor holds on to this dictionary,
+        # which is refilled with the model of each page.
+        self._model = {}
+        self._md = Markdown(
+            extensions=[
+                *MARKDOWN_EXTENSIONS,
+                JinjaMarkdownExtension(template_env, self._model),
+                IgnoreMetaExtension(),
+            ]
+        )
+
+    def convert(self, text: str, model: dict) -> str:
+        self._model.clear()
+        self._model.update(model)
+
+        # Clears state kept by extensions, like footnotes, from the previous
+        # file. Abbreviations are inline patterns, which reset() keeps.
+        self._md.reset()
+        self._remove_abbreviations()
+        return self._md.convert(text)
+
+    def _remove_abbreviations(self):
+        # The abbr extension registers a pattern named "abbr-<text>" for every
+        # abbreviation it finds. The registry has no public way to list names.
+        patterns = self._md.inlinePatterns
+        for name in [name for name in patterns._data if name.startswith("abbr-")]:
+            patterns.deregister(name)
+
+
+class RestructuredTextConverter(Converter):
+    """
+    Converts reStructuredText with docutils.
+    """
+
+    def __init__(self, template_env: Environment):
+        if importlib.util.find_spec("docutils") is None:
+            raise ConverterError(
+                "docutils must be installed to build reStructuredText content"
+            )
+
+        from docutils.core import publish_parts
+        from docutils.utils import SystemMessage
+
+        self._template_env = template_env
+        self._publish_parts = publish_parts
+        self._system_message = SystemMessage
+        self._settings = {
+            # Section titles stay sections, instead of becoming the document title.
+            "doctitle_xform": False,
+            # Top level sections are <h1>, like a single # in Markdown.
+            "initial_header_level": 1,
+            # Content can't pull in arbitrary files from the build machine.
+            "file_insertion_enabled": False,
+            "report_level": 3,
+        }
+
+    def convert(self, text: str, model: dict) -> str:
+        text = _strip_meta(text)
+        text = self._template_env.from_string(text).render(**model)
+
+        try:
+            parts = self._publish_parts(
+                text, writer_name="html5", settings_overrides=self._settings
+            )
+        except self._system_message as err:
+            raise ConverterError(str(err)) from err
+
+        return parts["body"]
+
+
+class JupyterHtmlConverter(Converter):
+    """
+    Extracts the body and styles of a notebook exported to HTML by nbconvert,
+    to be rendered into the layout.
+    """
+
+    jinja = False
+
+    def convert(self, text: str, model: dict) -> str:
+        soup = BeautifulSoup(text, features="html.parser")
+
+        styles = soup.head.find_all("style") if soup.head else []
+        body = soup.body or soup
+
+        return "".join(str(style) for style in styles) + body.decode_contents()
+
+
+class HtmlConverter(Converter):
+    """
+    Plain HTML, which is copied to the output without its metadata section.
+    """
+
+    jinja = False
+    layout = False
+
+    def convert(self, text: str, model: dict) -> str:
+        return _strip_meta(text)
+
+
+class ConverterRegistry(object):
+    """
+    Converters by file extension. Converters are created on first use,
+    and reused afterwards.
+    """
+
+    def __init__(self, default: Optional[str] = None):
+        self._factories: Dict[str, Callable[[], Converter]] = {}
+        # Keyed by factory, so extensions registered with
+        # the same factory share a converter.
+        self._converters: Dict[Callable[[], Converter], Converter] = {}
+        self._default = default
+
+    def register(self, ext: str, factory: Callable[[], Converter]):
+        """
+        :param ext: File extension without the leading dot. May span several
+            dots, like ``nb.html``, in which case it takes precedence over
+            the last extension of the file.
+        :param factory: Callable that creates the converter.
+        """
+        self._factories[ext.lower()] = factory
+
+    def get(self, file_path: str) -> Converter:
+        """
+        Converter of the given content file.
+
+        :raise ConverterError: When no converter is registered for the file.
+        """
+        ext = self._match_ext(file_path.lower())
+        if ext is None:
+            raise ConverterError("No converter for %s" % file_path)
+
+        factory = self._factories[ext]
+        converter = self._converters.get(factory)
+        if converter is None:
+            converter = factory()
+            self._converters[factory] = converter
+        return converter
+
+    def _match_ext(self, file_path: str) -> Optional[str]:
+        # The longest match wins, so ``nb.html`` beats ``html``.
+        matches = [ext for ext in self._factories if file_path.endswith("." + ext)]
+        if matches:
+            return max(matches, key=len)
+        return self._default
+
+
+def create_converters(template_env: Environment) -> ConverterRegistry:
+    """Registry of the converters of the built-in content formats."""
+    registry = ConverterRegistry(default="md")
+
+    def markdown():
+        return MarkdownConverter(template_env)
+
+    registry.register("md", markdown)
+    registry.register("markdown", markdown)
+    registry.register("rst", lambda: RestructuredTextConverter(template_env))
+    registry.register("nb.html", JupyterHtmlConverter)
+    registry.register("html", HtmlConverter)
+    registry.register("htm", HtmlConverter)
+
+    return registry
+
+
+def _strip_meta(text: str) -> str:
+    """Remove the metadata section from the start of the text."""
+    return "\n".join(IgnoreMetaProcessor(None).run(text.split("\n")))
@@ -0,0 +1,263 @@
+"""
+Dependency tracking for incremental builds.
+
+While a page renders, the template helpers report what they read: which
+``list_pages`` patterns were queried and which metadata fields of the listed
+pages were accessed, plus any files pulled in with ``inline_file``. The build
+stores a digest of those inputs next to the hash of the page's own source.
+
+On the next build a page is only rendered again when its source changed, or
+the digest of one of its inputs changed. Editing the body of a post doesn't
+change any metadata, so index pages that list it are left alone.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from . import osutils
+
+
+# File name of the dependency state inside the cache directory.
+DEPS_FILE = "deps.json"
+
+# Bumped when the structure of the state, or the way outputs are
+# generated, changes in a way that invalidates earlier builds.
+STATE_VERSION = 2
+
+# Field name recorded when a template consumes all metadata fields.
+ALL_FIELDS = "*"
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def build_key(config: dict, template_path: str, strict: bool = False) -> str:
+    """
+    Key of the inputs shared by every page: the config, all templates, and
+    whether undefined variables fail the build. When it changes, every page
+    must be rendered again.
+    """
+    digest = hashlib.sha256()
+    digest.update(str(STATE_VERSION).encode("utf-8"))
+    digest.update(b"strict" if strict else b"lenient")
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode("utf-8"))
+
+    for root, dirs, files in os.walk(template_path):
+        dirs.sort()
+        for filename in sorted(files):
+            file_path = os.path.join(root, filename)
+            digest.update(file_path.encode("utf-8"))
+            with open(file_path, "rb") as fp:
+                digest.update(fp.read())
+
+    return digest.hexdigest()
+
+
+class RecordingDict(dict):
+    """
+    Dictionary that records which keys are read.
+
+    Jinja2 resolves ``page.meta.title`` through item access, so reads from
+    templates end up in :meth:`__getitem__`. Iterating the dictionary
+    counts as reading every field.
+    """
+
+    def __init__(self, data: dict, fields: Set[str]):
+        super().__init__(data)
+        self._fields = fields
+
+    def __getitem__(self, key):
+        self._fields.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._fields.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._fields.add(key)
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self._fields.add(ALL_FIELDS)
+        return super().__iter__()
+
+    def keys(self):
+        self._fields.add(ALL_FIELDS)
+        return super().keys()
+
+    def values(self):
+        self._fields.add(ALL_FIELDS)
+        return super().values()
+
+    def items(self):
+        self._fields.add(ALL_FIELDS)
+        return super().items()
+
+
+class DependencyRecorder(object):
+    """
+    Collects the inputs consumed while rendering a single page.
+    """
+
+    def __init__(self):
+        self.queries: Dict[str, Set[str]] = {}
+        self.files: Set[str] = set()
+
+    def reset(self):
+        self.queries = {}
+        self.files = set()
+
+    def record_query(self, pattern: str) -> Set[str]:
+        """
+        Record a ``list_pages`` query.
+
+        Returns:
+            Set that collects the metadata fields read from the listed pages.
+        """
+        return self.queries.setdefault(pattern, set())
+
+    def record_file(self, file_path: str):
+        self.files.add(os.path.normpath(file_path))
+
+
+class DependencyResolver(object):
+    """
+    Computes digests of page inputs against the current state of the content.
+    Results are memoised, since many pages share the same queries.
+    """
+
+    def __init__(
+        self,
+        match_pages: Callable[[str], Iterable[str]],
+        get_meta: Callable[[str], dict],
+    ):
+        self._match_pages = match_pages
+        self._get_meta = get_meta
+        self._queries: Dict[tuple, str] = {}
+        self._files: Dict[str, Optional[str]] = {}
+
+    def query_digest(self, pattern: str, fields: Iterable[str]) -> str:
+        """Digest of the pages matching the pattern, and the given metadata fields."""
+        fields = tuple(sorted(fields))
+        key = (pattern, fields)
+
+        if key not in self._queries:
+            digest = hashlib.sha256()
+            for file_path in sorted(self._match_pages(pattern)):
+                digest.update(file_path.encode("utf-8"))
+                meta = self._get_meta(file_path)
+                if ALL_FIELDS in fields:
+                    values = sorted(meta.items())
+                else:
+                    values = [(name, meta.get(name)) for name in fields]
+                digest.update(repr(values).encode("utf-8"))
+            self._queries[key] = digest.hexdigest()
+
+        return self._queries[key]
+
+    def file_digest(self, file_path: str) -> Optional[str]:
+        """Digest of a file's contents, or None when it can't be read."""
+        if file_path not in self._files:
+            try:
+                with open(file_path, "rb") as fp:
+                    self._files[file_path] = hash_bytes(fp.read())
+            except OSError:
+                self._files[file_path] = None
+
+        return self._files[file_path]
+
+
+class BuildState(object):
+    """
+    Inputs of every page rendered by a build, persisted in the cache directory.
+    """
+
+    def __init__(self, key: str, pages: Optional[Dict[str, dict]] = None):
+        self.key = key
+        self.pages: Dict[str, dict] = pages or {}
+
+    @classmethod
+    def load(cls, cache_path: str, key: str) -> "BuildState":
+        """
+        Load the state of the previous build. When no state exists, or it was
+        recorded with a different build key, an empty state is returned.
+        """
+        logger = logging.getLogger(__name__)
+
+        try:
+            with open(os.path.join(cache_path, DEPS_FILE), encoding="utf-8") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return cls(key)
+
+        if data.get("key") != key:
+            logger.debug("Config or templates changed, rebuilding all pages")
+            return cls(key)
+
+        return cls(key, data.get("pages", {}))
+
+    def save(self, cache_path: str):
+        os.makedirs(cache_path, exist_ok=True)
+        data = json.dumps({"key": self.key, "pages": self.pages})
+        osutils.write_atomic(os.path.join(cache_path, DEPS_FILE), data.encode("utf-8"))
+
+    def is_fresh(
+        self, file_path: str, source_hash: str, resolver: DependencyResolver
+    ) -> bool:
+        """
+        Check whether the page's source and everything it consumed is unchanged
+        since it was recorded.
+        """
+        entry = self.pages.get(file_path)
+        if entry is None or entry["source"] != source_hash:
+            return False
+
+        for pattern, fields, digest in entry["queries"]:
+            if resolver.query_digest(pattern, fields) != digest:
+                return False
+
+        for dep_path, digest in entry["files"]:
+            if resolver.file_digest(dep_path) != digest:
+                return False
+
+        return True
+
+    def record(
+        self,
+        file_path: str,
+        source_hash: str,
+        recorder: DependencyRecorder,
+        resolver: DependencyResolver,
+        links: Iterable[str] = (),
+        ids: Optional[Iterable[str]] = (),
+    ):
+        """
+        Record the inputs consumed by a page that was just rendered, along
+        with the links and element ids of its output, for link checking.
+        Ids are None for outputs that weren't parsed.
+        """
+        queries: List[list] = []
+        for pattern, fields in sorted(recorder.queries.items()):
+            fields = sorted(fields)
+            queries.append([pattern, fields, resolver.query_digest(pattern, fields)])
+
+        files = [
+            [dep_path, resolver.file_digest(dep_path)]
+            for dep_path in sorted(recorder.files)
+        ]
+
+        self.pages[file_path] = {
+            "source": source_hash,
+            "queries": queries,
+            "files": files,
+            "links": list(links),
+            "ids": list(ids) if ids is not None else None,
+        }
+
+    def carry(self, previous: "BuildState", file_path: str):
+        """Keep the recorded inputs of a page that was skipped."""
+        self.pages[file_path] = previous.pages[file_path]
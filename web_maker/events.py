@@ -0,0 +1,282 @@
+"""
+Structured build events.
+
+The build reports its progress by emitting events on an :class:`EventBus`,
+which hands them to any number of sinks. Sinks write the events as JSON
+lines, draw a progress bar, or aggregate them into metrics.
+
+Events are dictionaries with an ``event`` kind, a ``time`` stamp in seconds
+since the epoch, and fields that depend on the kind:
+
+* ``build_started``: ``pages``, ``images``
+* ``build_finished``: ``duration``, ``peak_rss``
+* ``stage_finished``: ``stage``, ``duration``
+* ``page_started``: ``path``
+* ``page_finished``: ``path``, ``duration``
+* ``cache_hit``, ``cache_miss``: ``cache``, ``path``
+* ``file_written``: ``path``, ``bytes``
+
+Durations are in seconds. The peak resident set size is in bytes, or None
+where it can't be measured.
+"""
+import contextlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+import click
+
+
+BUILD_STARTED = "build_started"
+BUILD_FINISHED = "build_finished"
+STAGE_FINISHED = "stage_finished"
+PAGE_STARTED = "page_started"
+PAGE_FINISHED = "page_finished"
+CACHE_HIT = "cache_hit"
+CACHE_MISS = "cache_miss"
+FILE_WRITTEN = "file_written"
+
+
+class EventSink(object):
+    """
+    Receives build events. Sinks are called from the build thread, and from
+    the writer threads, but never concurrently.
+    """
+
+    def handle(self, event: dict):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class EventBus(object):
+    """
+    Dispatches build events to sinks.
+
+    Emitting is thread-safe, and costs next to nothing when there are no sinks.
+    """
+
+    def __init__(self, sinks: Iterable[EventSink] = ()):
+        self._sinks = list(sinks)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def enabled(self) -> bool:
+        """True when any sink receives the events."""
+        return bool(self._sinks)
+
+    def emit(self, kind: str, **fields):
+        if not self._sinks:
+            return
+
+        event = {"event": kind, "time": time.time(), **fields}
+        with self._lock:
+            for sink in self._sinks:
+                sink.handle(event)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Context manager that reports the duration of a build stage."""
+        start = time.perf_counter()
+        yield
+        self.emit(STAGE_FINISHED, stage=name, duration=time.perf_counter() - start)
+
+    def close(self):
+        for sink in self._sinks:
+            sink.close()
+
+
+class JsonLinesSink(EventSink):
+    """Writes each event as a line of JSON to a file."""
+
+    def __init__(self, file_path: str):
+        self._fp = open(file_path, "w", encoding="utf-8")
+
+    def handle(self, event: dict):
+        self._fp.write(json.dumps(event))
+        self._fp.write("\n")
+
+    def close(self):
+        self._fp.close()
+
+
+class ProgressSink(EventSink):
+    """
+    Draws a progress bar of the pages and images built. Every content file
+    emits exactly one lookup of the ``build`` cache, which advances the bar.
+    """
+
+    def __init__(self, file=None):
+        self._file = file or sys.stderr
+        self._bar = None
+
+    def handle(self, event: dict):
+        kind = event["event"]
+
+        if kind == BUILD_STARTED:
+            self._bar = click.progressbar(
+                length=event["pages"] + event["images"],
+                label="Building",
+                file=self._file,
+            )
+            self._bar.__enter__()
+        elif self._bar is not None:
+            if kind in (CACHE_HIT, CACHE_MISS) and event["cache"] == "build":
+                self._bar.update(1)
+            elif kind == BUILD_FINISHED:
+                self.close()
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.__exit__(None, None, None)
+            self._bar = None
+
+
+class LogSummarySink(EventSink):
+    """
+    Logs a periodic summary of build progress, instead of a line per file.
+    """
+
+    def __init__(self, interval: float = 2.0, logger: logging.Logger = None):
+        self._interval = interval
+        self._logger = logger or logging.getLogger(__name__)
+        self._total = 0
+        self._rendered = 0
+        self._skipped = 0
+        self._files = 0
+        self._bytes = 0
+        self._next_report = 0.0
+
+    def handle(self, event: dict):
+        kind = event["event"]
+
+        if kind == BUILD_STARTED:
+            self._total = event["pages"] + event["images"]
+            self._next_report = time.monotonic() + self._interval
+        elif kind in (CACHE_HIT, CACHE_MISS) and event["cache"] == "build":
+            if kind == CACHE_HIT:
+                self._skipped += 1
+            else:
+                self._rendered += 1
+
+            now = time.monotonic()
+            if now >= self._next_report:
+                self._next_report = now + self._interval
+                self._logger.info(
+                    "Processed %d/%d files (%d up to date)",
+                    self._rendered + self._skipped,
+                    self._total,
+                    self._skipped,
+                )
+        elif kind == FILE_WRITTEN:
+            self._files += 1
+            self._bytes += event["bytes"]
+        elif kind == BUILD_FINISHED:
+            self._logger.info(
+                "Processed %d files: %d built, %d up to date, "
+                "%d written (%d bytes) in %.2fs",
+                self._rendered + self._skipped,
+                self._rendered,
+                self._skipped,
+                self._files,
+                self._bytes,
+                event["duration"],
+            )
+
+
+class MetricsSink(EventSink):
+    """
+    Aggregates events into counters, and writes them to a file in the
+    Prometheus text exposition format when closed.
+    """
+
+    def __init__(self, file_path: str):
+        self._file_path = file_path
+        self._pages = 0
+        self._page_seconds = 0.0
+        self._files = 0
+        self._bytes = 0
+        self._cache: Dict[tuple, int] = defaultdict(int)
+        self._stages: Dict[str, float] = {}
+        self._build_seconds: Optional[float] = None
+        self._peak_rss: Optional[int] = None
+
+    def handle(self, event: dict):
+        kind = event["event"]
+
+        if kind == PAGE_FINISHED:
+            self._pages += 1
+            self._page_seconds += event["duration"]
+        elif kind in (CACHE_HIT, CACHE_MISS):
+            result = "hit" if kind == CACHE_HIT else "miss"
+            self._cache[(event["cache"], result)] += 1
+        elif kind == FILE_WRITTEN:
+            self._files += 1
+            self._bytes += event["bytes"]
+        elif kind == STAGE_FINISHED:
+            self._stages[event["stage"]] = event["duration"]
+        elif kind == BUILD_FINISHED:
+            self._build_seconds = event["duration"]
+            self._peak_rss = event.get("peak_rss")
+
+    def render(self) -> str:
+        lines = [
+            "# HELP web_maker_pages_rendered_total Pages rendered.",
+            "# TYPE web_maker_pages_rendered_total counter",
+            "web_maker_pages_rendered_total %d" % self._pages,
+            "# HELP web_maker_page_render_seconds Time spent rendering pages.",
+            "# TYPE web_maker_page_render_seconds summary",
+            "web_maker_page_render_seconds_sum %f" % self._page_seconds,
+            "web_maker_page_render_seconds_count %d" % self._pages,
+            "# HELP web_maker_files_written_total Output files written.",
+            "# TYPE web_maker_files_written_total counter",
+            "web_maker_files_written_total %d" % self._files,
+            "# HELP web_maker_bytes_written_total Bytes written to output files.",
+            "# TYPE web_maker_bytes_written_total counter",
+            "web_maker_bytes_written_total %d" % self._bytes,
+            "# HELP web_maker_cache_lookups_total Cache lookups by cache and result.",
+            "# TYPE web_maker_cache_lookups_total counter",
+        ]
+        for (cache, result), count in sorted(self._cache.items()):
+            lines.append(
+                'web_maker_cache_lookups_total{cache="%s",result="%s"} %d'
+                % (cache, result, count)
+            )
+
+        lines += [
+            "# HELP web_maker_stage_seconds Duration of build stages.",
+            "# TYPE web_maker_stage_seconds gauge",
+        ]
+        for stage, duration in sorted(self._stages.items()):
+            lines.append('web_maker_stage_seconds{stage="%s"} %f' % (stage, duration))
+
+        if self._build_seconds is not None:
+            lines += [
+                "# HELP web_maker_build_seconds Duration of the whole build.",
+                "# TYPE web_maker_build_seconds gauge",
+                "web_maker_build_seconds %f" % self._build_seconds,
+            ]
+
+        if self._peak_rss is not None:
+            lines += [
+                "# HELP web_maker_peak_rss_bytes Peak resident set size of the build.",
+                "# TYPE web_maker_peak_rss_bytes gauge",
+                "web_maker_peak_rss_bytes %d" % self._peak_rss,
+            ]
+
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with open(self._file_path, "w", encoding="utf-8") as fp:
+            fp.write(self.render())
@@ -0,0 +1,182 @@
+"""
+Image stage of the build.
+
+Images in the content directory are copied to the output directory as they
+are. When widths are configured, a resized variant is generated for each
+width, named after the original with a ``-<width>w`` suffix. Variants are
+generated on a process pool, and cached by the hash of the source image, so
+unchanged images are never processed again.
+
+Resizing requires Pillow, which is an optional dependency.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+import importlib.util
+import logging
+import multiprocessing
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .events import CACHE_HIT, CACHE_MISS, EventBus
+from .utils import extract_ext
+
+
+# File extensions handled by the image stage.
+IMAGE_EXTENSIONS = frozenset(("png", "jpg", "jpeg", "gif", "webp"))
+
+# Sub-directory of the cache directory where generated variants are kept.
+IMAGE_CACHE_DIR = "images"
+
+
+class ImageError(Exception):
+    """
+    Errors raised while processing images.
+    """
+
+    pass
+
+
+def is_image(file_path: str) -> bool:
+    ext = extract_ext(os.path.basename(file_path))
+    return ext is not None and ext.lower() in IMAGE_EXTENSIONS
+
+
+def variant_path(file_path: str, width: int) -> str:
+    """
+    Path of the variant of an image with the given width.
+
+    >>> variant_path('content/images/photo.jpg', 320)
+    'content/images/photo-320w.jpg'
+    """
+    stem, ext = os.path.splitext(file_path)
+    return "%s-%dw%s" % (stem, width, ext)
+
+
+class ImageProcessor(object):
+    """
+    Generates image variants on a process pool, and copies them to the
+    output directory through the writer.
+
+    The process pool is only started once the first variant that isn't
+    cached is submitted.
+    """
+
+    def __init__(
+        self,
+        cache_path: str,
+        widths: Sequence[int],
+        max_workers: Optional[int] = None,
+        events: EventBus = None,
+    ):
+        self._cache_dir = os.path.join(cache_path, IMAGE_CACHE_DIR)
+        self._widths = tuple(widths)
+        self._max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: List[Tuple[Future, str, str]] = []
+        self._events = events if events is not None else EventBus()
+        self._logger = logging.getLogger(__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def variant_targets(self, target_path: str) -> Dict[int, str]:
+        """Output paths of the variants of the image at the given target path."""
+        return {width: variant_path(target_path, width) for width in self._widths}
+
+    def submit(self, source_path: str, source_hash: str, target_path: str, writer):
+        """
+        Copy the image to the target path, and schedule its variants.
+
+        Cached variants are copied straight away. Missing variants are
+        generated on the process pool, and copied by :meth:`finish`.
+
+        :raise ImageError: When variants must be generated, and Pillow isn't installed.
+        """
+        writer.copy(source_path, target_path)
+
+        ext = os.path.splitext(source_path)[1].lower()
+
+        for width, variant_target in self.variant_targets(target_path).items():
+            cached = os.path.join(
+                self._cache_dir, "%s-%d%s" % (source_hash, width, ext)
+            )
+
+            if os.path.exists(cached):
+                self._logger.debug("Image cache hit %s %dw", source_path, width)
+                self._events.emit(CACHE_HIT, cache="image", path=variant_target)
+                writer.copy(cached, variant_target)
+                continue
+
+            self._logger.debug("Image cache miss %s %dw", source_path, width)
+            self._events.emit(CACHE_MISS, cache="image", path=variant_target)
+            future = self._get_executor().submit(
+                _resize_image, source_path, cached, width
+            )
+            self._pending.append((future, cached, variant_target))
+
+    def finish(self, writer):
+        """
+        Wait for the scheduled variants, and copy them to the output directory.
+
+        :raise ImageError: When an image couldn't be processed.
+        """
+        pending, self._pending = self._pending, []
+
+        for future, cached, variant_target in pending:
+            try:
+                future.result()
+            except (OSError, ValueError) as err:
+                raise ImageError("Error resizing image %s" % variant_target) from err
+            writer.copy(cached, variant_target)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            if importlib.util.find_spec("PIL") is None:
+                raise ImageError(
+                    "Pillow must be installed to generate image variants. "
+                    "Install it, or remove image_widths from the config."
+                )
+
+            os.makedirs(self._cache_dir, exist_ok=True)
+            # Workers are started while the output writer's threads are
+            # running. Forking a process with running threads can copy
+            # locks held by those threads, so workers are spawned instead.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        return self._executor
+
+
+def _resize_image(source_path: str, cache_path: str, width: int):
+    """
+    Resize the image to the given width, keeping its aspect ratio, and store
+    the result at the cache path. Images are never scaled up; when the source
+    is narrower than the width, it is stored unchanged.
+
+    Runs in a worker process.
+    """
+    from PIL import Image
+
+    # Save next to the cache file first, so a crash never
+    # leaves a truncated variant that looks cached.
+    tmp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+
+    with Image.open(source_path) as image:
+        if image.width <= width:
+            shutil.copyfile(source_path, tmp_path)
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            resized.save(tmp_path, format=image.format)
+
+    os.replace(tmp_path, cache_path)
@@ -0,0 +1,209 @@
+"""
+Read-only index of page metadata, shared between processes through a
+memory-mapped file.
+
+The index is written once per build, after content discovery. Worker
+processes open the file and map it into memory instead of re-scanning the
+content directory, so attaching to the index takes constant time, and the
+operating system shares the mapped pages between all workers.
+
+File layout, all integers little-endian:
+
+* Header: magic ``WMIX``, format version (u32), entry count (u32).
+* Entry table: one ``(key offset, key length, record offset, record length)``
+  row of u32 per page, sorted by key.
+* Data: UTF-8 encoded keys, and pickled records.
+
+Keys are normalised content file paths. Records are only unpickled when a
+page is looked up.
+"""
+import mmap
+import os
+import pickle
+import struct
+from typing import Iterable, Iterator, Optional, Tuple
+
+from . import osutils
+
+
+class PageIndexError(Exception):
+    """
+    Errors raised while reading or writing a page index file.
+    """
+
+    pass
+
+
+class PageIndex(object):
+    """
+    Memory-mapped page metadata index.
+
+    Each record is a dictionary with the keys:
+
+    * ``file_path``: Normalised path to the content file.
+    * ``meta``: Validated page metadata.
+    * ``sort_keys``: Sort keys of the metadata date fields.
+    * ``output``: Path of the generated file, relative to the output directory.
+    * ``url``: URL of the generated file.
+    """
+
+    MAGIC = b"WMIX"
+    VERSION = 1
+
+    _header = struct.Struct("<4sII")
+    _entry = struct.Struct("<IIII")
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+        try:
+            magic, version, count = self._header.unpack_from(buffer, 0)
+        except struct.error as err:
+            raise PageIndexError("Page index is truncated") from err
+
+        if magic != self.MAGIC:
+            raise PageIndexError("Not a page index file")
+
+        if version != self.VERSION:
+            raise PageIndexError("Unsupported page index version %d" % version)
+
+        self._count = count
+
+    @classmethod
+    def open(cls, file_path: str) -> "PageIndex":
+        """
+        Map the index file at the given path into memory.
+
+        :raise PageIndexError: When the file can't be opened, or isn't a valid index.
+        """
+        try:
+            with open(file_path, "rb") as fp:
+                buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as err:
+            raise PageIndexError("Error opening page index %s" % file_path) from err
+
+        return cls(buffer)
+
+    @classmethod
+    def write(cls, file_path: str, records: Iterable[dict]):
+        """
+        Serialise the given page records into an index file.
+
+        The file is replaced atomically, so processes that have the previous
+        index mapped keep a consistent view.
+        """
+        osutils.write_atomic(file_path, cls.dumps(records))
+
+    @classmethod
+    def dumps(cls, records: Iterable[dict]) -> bytes:
+        """Serialise the given page records into the index format."""
+        # Records are pickled as they arrive, so only their
+        # compact serialised form is held until the table is built.
+        items = sorted(
+            (
+                (
+                    os.path.normpath(record["file_path"]).encode("utf-8"),
+                    pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL),
+                )
+                for record in records
+            ),
+            key=lambda item: item[0],
+        )
+
+        table_size = cls._header.size + cls._entry.size * len(items)
+        table = bytearray(table_size)
+        data = bytearray()
+
+        cls._header.pack_into(table, 0, cls.MAGIC, cls.VERSION, len(items))
+
+        for i, (key, record_bytes) in enumerate(items):
+            key_offset = table_size + len(data)
+            data += key
+
+            record_offset = table_size + len(data)
+            data += record_bytes
+
+            cls._entry.pack_into(
+                table,
+                cls._header.size + cls._entry.size * i,
+                key_offset,
+                len(key),
+                record_offset,
+                len(record_bytes),
+            )
+
+        return bytes(table + data)
+
+    def close(self):
+        self._view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, file_path: str) -> bool:
+        return self._find(file_path) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the file paths in the index, in sorted order."""
+        for i in range(self._count):
+            yield self._key(i)
+
+    def get(self, file_path: str) -> Optional[dict]:
+        """
+        Look up the record of the page at the given file path.
+
+        Returns:
+            A new record dictionary, or None if the page isn't in the index.
+        """
+        i = self._find(file_path)
+        if i is None:
+            return None
+
+        return self._record(i)
+
+    def records(self) -> Iterator[Tuple[str, dict]]:
+        """Iterate all file paths and records, in sorted order."""
+        for i in range(self._count):
+            yield self._key(i), self._record(i)
+
+    def _find(self, file_path: str) -> Optional[int]:
+        key = os.path.normpath(file_path).encode("utf-8")
+
+        # Binary search over the sorted entry table.
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = self._key_bytes(mid)
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return mid
+
+        return None
+
+    def _entry_at(self, i: int) -> Tuple[int, int, int, int]:
+        return self._entry.unpack_from(
+            self._buffer, self._header.size + self._entry.size * i
+        )
+
+    def _key_bytes(self, i: int) -> bytes:
+        key_offset, key_len, _, _ = self._entry_at(i)
+        return self._buffer[key_offset : key_offset + key_len]
+
+    def _key(self, i: int) -> str:
+        return self._key_bytes(i).decode("utf-8")
+
+    def _record(self, i: int) -> dict:
+        _, _, record_offset, record_len = self._entry_at(i)
+        return pickle.loads(self._view[record_offset : record_offset + record_len])
@@ -1,10 +1,32 @@
 """
 Jina2 customisation.
 """
+import rcssmin
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Undefined
 from markdown import Extension
 from markdown.preprocessors import Preprocessor
 
 
+def create_template_env(config: dict, strict: bool = False) -> Environment:
+    """
+    Creates the Jinja2 environment that layout templates are loaded from.
+
+    :param config: Config dictionary.
+    :param strict: When True, using an undefined variable raises an error,
+        instead of rendering as an empty string.
+    """
+    # Templates don't change during a build, so there's no
+    # need to check their files for changes on every use.
+    template_env = Environment(
+        loader=FileSystemLoader(config["template_path"]),
+        auto_reload=False,
+        undefined=StrictUndefined if strict else Undefined,
+    )
+    template_env.filters["cssmin"] = rcssmin.cssmin
+    template_env.filters["first"] = lambda seq: seq[0] if seq else ""
+    return template_env
+
+
 class JinjaMarkdownExtension(Extension):
     def __init__(self, template_env, model=None):
         self.config = {}
@@ -60,6 +82,12 @@ class IgnoreMetaProcessor(Preprocessor):
         super().__init__(md)
 
     def run(self, lines):
+        # The section must open the file. Marker lines
+        # further down are content, like horizontal rules.
+        first_line = next((line for line in lines if line.strip()), "")
+        if first_line.strip() != "---":
+            return lines
+
         ignoring = False
 
         for index, line in enumerate(lines):
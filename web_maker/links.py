@@ -0,0 +1,140 @@
+"""
+Checking of internal links between generated pages.
+
+While a page renders, the links and element ids of its HTML are collected
+from the same BeautifulSoup tree that is used to prettify the output, and
+stored in the build state. Pages skipped by an incremental build keep the
+links recorded when they last rendered, so every page is checked without
+parsing its output again.
+
+Once all pages are built, every link that points into the site is resolved
+to an output file, and its fragment to an element id of the target page.
+Heading ids generated by the ``toc`` extension are ordinary element ids, so
+links to sections are checked as well. Links to other hosts are ignored.
+"""
+import json
+import os
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+from urllib.parse import unquote, urljoin, urlsplit
+
+from bs4 import BeautifulSoup
+
+from . import osutils
+
+
+# Tags and attributes that link to another resource.
+LINK_ATTRS = (
+    ("a", "href"),
+    ("link", "href"),
+    ("img", "src"),
+    ("script", "src"),
+    ("source", "src"),
+)
+
+
+class BrokenLink(NamedTuple):
+    # Output key of the page containing the link.
+    page: str
+    href: str
+    reason: str
+
+
+def extract_links(soup: BeautifulSoup) -> Tuple[List[str], List[str]]:
+    """
+    Collect the link targets and the element ids of a rendered page.
+
+    Returns:
+        Sorted, distinct link targets and ids.
+    """
+    links = set()
+    for tag_name, attr in LINK_ATTRS:
+        for tag in soup.find_all(tag_name):
+            value = tag.get(attr)
+            if value:
+                links.add(value.strip())
+
+    ids = {tag["id"] for tag in soup.find_all(id=True)}
+
+    # Named anchors are valid fragment targets too.
+    ids.update(tag["name"] for tag in soup.find_all("a", attrs={"name": True}))
+
+    return sorted(links), sorted(ids)
+
+
+def check_links(
+    base_url: str,
+    pages: Dict[str, Tuple[Iterable[str], Iterable[str]]],
+    outputs: Set[str],
+) -> Tuple[int, List[BrokenLink]]:
+    """
+    Check the internal links of every page.
+
+    Args:
+        base_url: Base URL of the site, which internal links start with.
+        pages: Links and ids of each page, by the page's output key.
+        outputs: Keys of every file in the generated site.
+
+    Returns:
+        Number of internal links checked, and the broken ones.
+    """
+    base = urlsplit(base_url)
+    base_path = base.path if base.path.endswith("/") else base.path + "/"
+    page_ids = {key: set(ids) for key, (_, ids) in pages.items()}
+
+    checked = 0
+    broken = []
+
+    for page_key, (links, _) in sorted(pages.items()):
+        page_url = urljoin(base_url, page_key)
+
+        for href in links:
+            url = urlsplit(urljoin(page_url, href))
+
+            # Links to other sites, mailto: and the like.
+            if url.scheme not in ("", base.scheme) or url.netloc != base.netloc:
+                continue
+            if not url.path.startswith(base_path):
+                continue
+
+            checked += 1
+            target = _resolve_target(unquote(url.path[len(base_path) :]), outputs)
+
+            if target is None:
+                broken.append(BrokenLink(page_key, href, "missing file"))
+            elif url.fragment and target in page_ids:
+                if unquote(url.fragment) not in page_ids[target]:
+                    broken.append(BrokenLink(page_key, href, "missing anchor"))
+
+    return checked, broken
+
+
+def write_link_report(file_path: str, checked: int, broken: List[BrokenLink]):
+    """Write the result of a link check as JSON."""
+    data = json.dumps(
+        {
+            "checked": checked,
+            "broken": [link._asdict() for link in broken],
+        },
+        indent=2,
+    )
+    dir_path = os.path.dirname(file_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    osutils.write_atomic(file_path, data.encode("utf-8"))
+
+
+def _resolve_target(key: str, outputs: Set[str]):
+    """
+    Output key a site path refers to, or None when no such file was
+    generated. Directory paths refer to their index page.
+    """
+    if key == "" or key.endswith("/"):
+        key += "index.html"
+    if key in outputs:
+        return key
+
+    index_key = key + "/index.html"
+    if index_key in outputs:
+        return index_key
+
+    return None
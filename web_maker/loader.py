@@ -1,14 +1,20 @@
 from copy import deepcopy
+import datetime
 import logging
 import os
 from typing import Dict, Optional
 
-from marshmallow import fields, EXCLUDE, ValidationError, Schema
+from marshmallow import fields, utils, EXCLUDE, ValidationError, Schema
 import yaml
 
+from .index import PageIndex
 from .utils import format_validation_errors
 
 
+# Metadata fields holding dates, which pages can be ordered and filtered by.
+DATE_FIELDS = ("created", "published")
+
+
 class PageLoadError(Exception):
     """
     Error raised during loading or processing page content files.
@@ -25,10 +31,20 @@ class PageLoader(object):
     can be used before the contents are parsed and rendered.
 
     Loaded metadata and content are cached, using the given path as a caching key.
+
+    When a page index is given, metadata of indexed pages is read from the index
+    instead of the content files. Worker processes attach to the index written
+    by the main process, so they don't have to load every page's metadata again.
+
+    When ``keep_bodies`` is False, file contents are read from disk each time
+    they're requested, and never cached, so memory use doesn't grow with the
+    size of the site.
     """
 
-    def __init__(self):
+    def __init__(self, index: Optional[PageIndex] = None, keep_bodies: bool = True):
         self._cache: Dict[str, PageLoader.CacheItem] = {}
+        self._index = index
+        self._keep_bodies = keep_bodies
         self._section_marker = b"---"
         self._logger = logging.getLogger(__name__)
 
@@ -39,10 +55,46 @@ class PageLoader(object):
         :raise PageLoadError: On IO failures, metadata parsing or validation errors.
         """
         file_path = os.path.normpath(file_path)
+
+        if self._index is not None and file_path not in self._cache:
+            record = self._index.get(file_path)
+            if record is not None:
+                # Records are unpickled on every lookup, so they're already a copy.
+                return record["meta"]
+
         self._get_or_load(file_path)
 
         return deepcopy(self._cache[file_path].meta)
 
+    def get_sort_keys(self, file_path) -> Dict[str, Optional[int]]:
+        """
+        Sort keys of the date fields of the page at the given file path.
+        Keys are None for dates that aren't set.
+
+        :raise PageLoadError: On IO failures, metadata parsing or validation errors.
+        """
+        file_path = os.path.normpath(file_path)
+
+        if self._index is not None and file_path not in self._cache:
+            record = self._index.get(file_path)
+            if record is not None:
+                return record["sort_keys"]
+
+        self._get_or_load(file_path)
+
+        return self._cache[file_path].sort_keys
+
+    def attach_index(self, index: Optional[PageIndex]):
+        """
+        Serve metadata from the given index from now on, and drop the cached
+        metadata of the pages it contains. None detaches the current index.
+        """
+        self._index = index
+        if index is not None:
+            for file_path in list(self._cache):
+                if file_path in index:
+                    del self._cache[file_path]
+
     def load_page(self, file_path) -> bytes:
         """
         Load the contents of the file at the given file path.
@@ -50,6 +102,14 @@ class PageLoader(object):
         :raise PageLoadError: On IO failure.
         """
         file_path = os.path.normpath(file_path)
+
+        if not self._keep_bodies:
+            try:
+                with open(file_path, "rb") as fp:
+                    return fp.read()
+            except OSError as err:
+                raise PageLoadError("Error opening file %s" % file_path) from err
+
         self._get_or_load(file_path)
 
         return self._cache[file_path].file_bytes
@@ -70,8 +130,16 @@ class PageLoader(object):
                 metadata = BuiltinMetaSchema(unknown=EXCLUDE).load(metadata)
                 self._logger.debug("Metadata %s", metadata)
 
+                # Computed once here, so listing pages in date
+                # order doesn't compare dates on every render.
+                sort_keys = {
+                    name: date_sort_key(metadata[name]) for name in DATE_FIELDS
+                }
+
                 self._cache[file_path] = PageLoader.CacheItem(
-                    meta=metadata, file_bytes=data
+                    meta=metadata,
+                    file_bytes=data if self._keep_bodies else None,
+                    sort_keys=sort_keys,
                 )
         except OSError as err:
             raise PageLoadError("Error opening file %s" % file_path) from err
@@ -92,7 +160,14 @@ class PageLoader(object):
         Metadata begins and ends with a marker line, splitting the
         file into three parts. When the parts are not exactly three,
         it is ignored and None is returned.
+
+        The section must open the file. Marker lines further down, like
+        ones in the output cells of a notebook, are content.
         """
+        data = data.lstrip()
+        if not data.startswith(self._section_marker):
+            return None
+
         parts = data.split(self._section_marker, 2)
         if len(parts) == 3:
             # Section present
@@ -105,11 +180,59 @@ class PageLoader(object):
         __slots__ = (
             "meta",
             "file_bytes",
+            "sort_keys",
         )
 
-        def __init__(self, meta=None, file_bytes=None):
+        def __init__(self, meta=None, file_bytes=None, sort_keys=None):
             self.meta = meta
             self.file_bytes = file_bytes
+            self.sort_keys = sort_keys
+
+
+def date_sort_key(value: Optional[datetime.date]) -> Optional[int]:
+    """
+    Sort key of a metadata date, in seconds since the start of year 1.
+    Dates without a time sort as midnight, so dates and times of the
+    same day can be compared.
+    """
+    if value is None:
+        return None
+
+    key = value.toordinal() * 86400
+    if isinstance(value, datetime.datetime):
+        key += value.hour * 3600 + value.minute * 60 + value.second
+    return key
+
+
+class MetaDate(fields.DateTime):
+    """
+    Date, or date and time, in page metadata.
+
+    YAML loads unquoted dates into ``datetime.date`` and ``datetime.datetime``
+    objects, while quoted dates remain strings. Both are loaded into the same
+    types. Times with a timezone are converted to UTC.
+    """
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if isinstance(value, datetime.datetime):
+            return _to_naive_utc(value)
+        if isinstance(value, datetime.date):
+            return value
+        if not isinstance(value, str):
+            raise self.make_error("invalid", input=value, obj_type=self.OBJ_TYPE)
+
+        try:
+            return utils.from_iso_date(value)
+        except (TypeError, ValueError):
+            pass
+
+        return _to_naive_utc(super()._deserialize(value, attr, data, **kwargs))
+
+
+def _to_naive_utc(value: datetime.datetime) -> datetime.datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
 
 
 class BuiltinMetaSchema(Schema):
@@ -120,9 +243,8 @@ class BuiltinMetaSchema(Schema):
     title = fields.String(missing="page")
     template = fields.String(missing=None)
     draft = fields.Boolean(missing=False)
-    # FIXME: yaml loader outputs datetime.date, marshmallow expects a string
-    created = fields.Inferred()
-    published = fields.Inferred()
+    created = MetaDate(missing=None, allow_none=True)
+    published = MetaDate(missing=None, allow_none=True)
 
 
 class PageSchema(Schema):
@@ -0,0 +1,100 @@
+"""
+Memory usage of the build process.
+
+The resident set size (RSS) is read from ``/proc`` on Linux. Peak RSS comes
+from ``getrusage``, which is available on Unix platforms. Where neither is
+available, sizes are reported as None and the memory guard does nothing.
+"""
+import logging
+import os
+import re
+import sys
+from typing import Optional
+
+
+# Multipliers of the suffixes accepted by parse_size.
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class MemoryLimitError(Exception):
+    """
+    Error raised when the build uses more memory than allowed.
+    """
+
+    pass
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size in bytes, with an optional K, M or G suffix.
+
+    >>> parse_size('512M')
+    536870912
+
+    :raise ValueError: When the size is malformed.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([KMG]?)i?B?\s*", value, re.IGNORECASE)
+    if match is None:
+        raise ValueError("Size must be a number of bytes, like 512M or 2G")
+
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).upper()]
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return "unknown"
+    return "%.1f MiB" % (size / 1024 ** 2)
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None when unknown."""
+    try:
+        with open("/proc/self/statm", "rb") as fp:
+            resident_pages = int(fp.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss() -> Optional[int]:
+    """Highest resident set size of this process in bytes, or None when unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryGuard(object):
+    """
+    Fails the build when the resident set size of the process grows beyond
+    a limit, so a runaway build stops with a clear error instead of being
+    killed by the operating system.
+    """
+
+    def __init__(self, limit: Optional[int]):
+        self._limit = limit
+        self._logger = logging.getLogger(__name__)
+
+        if limit is not None and current_rss() is None:
+            self._logger.warning("Memory usage can't be measured on this platform")
+            self._limit = None
+
+    def check(self, file_path: str):
+        """
+        :raise MemoryLimitError: When the process uses more memory than the limit.
+        """
+        if self._limit is None:
+            return
+
+        rss = current_rss()
+        if rss is not None and rss > self._limit:
+            raise MemoryLimitError(
+                "Memory usage of %s exceeds the limit of %s, after building %s"
+                % (format_size(rss), format_size(self._limit), file_path)
+            )
@@ -12,3 +12,19 @@ def cd(target_dir: str) -> Generator[None, None, None]:
         yield
     finally:
         os.chdir(cwd)
+
+
+def write_atomic(file_path: str, data: bytes):
+    """
+    Write data to a file by writing to a temporary file in the same directory,
+    and then replacing the target. Readers never observe a partially written file.
+    """
+    tmp_path = "%s.%d.tmp" % (file_path, os.getpid())
+    try:
+        with open(tmp_path, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,180 @@
+"""
+Bookkeeping of generated output files.
+
+Each build records the files it produced in a manifest kept in the cache
+directory. The next build compares its own outputs against the manifest to
+find orphans, which are files generated from pages that have since been
+deleted or renamed, without walking the output directory.
+"""
+import json
+import logging
+import os
+import shutil
+from typing import Iterable, List, Optional, Set
+
+from . import osutils
+from .config import ConfigError
+
+
+# File name of the output manifest inside the cache directory.
+MANIFEST = "manifest.json"
+
+
+def output_key(dist_path: str, file_path: str) -> str:
+    """
+    Key of an output file in the manifest, which is the path relative
+    to the output directory, using forward slashes.
+    """
+    return os.path.relpath(file_path, dist_path).replace(os.sep, "/")
+
+
+def is_valid_key(key: str) -> bool:
+    """
+    Whether the output key stays inside the output directory. Keys read
+    from manifests on disk are checked before they are joined to a path.
+    """
+    return not os.path.isabs(key) and ".." not in key.split("/")
+
+
+def load_manifest(cache_path: str) -> Optional[Set[str]]:
+    """
+    Load the set of outputs recorded by the previous build.
+
+    Returns:
+        Set of output keys, or None when no readable manifest exists.
+    """
+    try:
+        with open(os.path.join(cache_path, MANIFEST), "r", encoding="utf-8") as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+    return set(manifest.get("outputs", []))
+
+
+def save_manifest(cache_path: str, outputs: Iterable[str]):
+    """Record the outputs produced by the current build."""
+    os.makedirs(cache_path, exist_ok=True)
+    data = json.dumps({"outputs": sorted(outputs)}, indent=0)
+    osutils.write_atomic(os.path.join(cache_path, MANIFEST), data.encode("utf-8"))
+
+
+def source_paths(config: dict, project_path: str = os.curdir) -> List[str]:
+    """
+    Directories the output directory must never be, or contain: the project
+    directory holding ``conf.py``, and the content and template directories.
+    """
+    return [project_path, config["content_path"], config["template_path"]]
+
+
+def check_dist_path(dist_path: str, protected_paths: Iterable[str]):
+    """
+    Make sure deleting files in the output directory can't delete sources.
+
+    :raise ConfigError: When the output directory is, or contains, one of
+        the protected directories.
+    """
+    dist = os.path.realpath(dist_path)
+
+    for path in protected_paths:
+        protected = os.path.realpath(path)
+        if os.path.commonpath([dist, protected]) == dist:
+            raise ConfigError(
+                "Output directory %s contains %s, refusing to delete files in it"
+                % (dist_path, path)
+            )
+
+
+def prune_outputs(
+    dist_path: str,
+    outputs: Set[str],
+    previous: Optional[Set[str]] = None,
+    protected_paths: Iterable[str] = (),
+) -> Set[str]:
+    """
+    Delete files from the output directory that were not produced by the
+    current build.
+
+    Args:
+        dist_path: Output directory.
+        outputs: Keys of the files produced by the current build.
+        previous: Keys recorded by the previous build. When given, only those
+            files are considered, and the output directory isn't walked. When
+            None, the whole output directory is walked once.
+        protected_paths: Source directories, which the output directory must
+            not be or contain.
+
+    Returns:
+        Keys of the deleted files.
+
+    Raises:
+        ConfigError: When the output directory contains a protected directory.
+    """
+    logger = logging.getLogger(__name__)
+
+    check_dist_path(dist_path, protected_paths)
+
+    if previous is None:
+        logger.debug("No output manifest, walking %s", dist_path)
+        previous = set()
+        for root, _, files in os.walk(dist_path):
+            for filename in files:
+                previous.add(output_key(dist_path, os.path.join(root, filename)))
+
+    orphans = previous - outputs
+    dirs = set()
+
+    for key in sorted(orphans):
+        # Never follow a manifest entry out of the output directory.
+        if not is_valid_key(key):
+            logger.warning("Skipping invalid output path %s", key)
+            continue
+
+        file_path = os.path.join(dist_path, *key.split("/"))
+        logger.debug("Pruning %s", file_path)
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        dirs.add(os.path.dirname(file_path))
+
+    _remove_empty_dirs(dist_path, dirs)
+
+    return orphans
+
+
+def clean_outputs(
+    dist_path: str, cache_paths: Iterable[str], protected_paths: Iterable[str] = ()
+):
+    """
+    Delete the output directory and the given cache directories.
+
+    :raise ConfigError: When the output directory is, or contains, one of
+        the protected directories.
+    """
+    logger = logging.getLogger(__name__)
+
+    check_dist_path(dist_path, protected_paths)
+
+    for path in (dist_path, *cache_paths):
+        if os.path.isdir(path):
+            logger.info("Removing %s", path)
+            shutil.rmtree(path)
+
+
+def _remove_empty_dirs(dist_path: str, dirs: Set[str]):
+    """Remove the given directories, and their parents, when they are empty."""
+    root = os.path.normpath(dist_path)
+
+    # Deepest directories first, so parents are empty by the time they're visited.
+    for dir_path in sorted(dirs, key=len, reverse=True):
+        dir_path = os.path.normpath(dir_path)
+        while dir_path != root and dir_path.startswith(root):
+            try:
+                os.rmdir(dir_path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Not empty
+                break
+            dir_path = os.path.dirname(dir_path)
@@ -0,0 +1,37 @@
+"""
+Schema of the website project configuration.
+"""
+from marshmallow import fields, validate, Schema, EXCLUDE
+
+from .config import CACHE_DIR
+
+
+class ConfigSchema(Schema):
+    site_name = fields.String(missing="website")
+    content_path = fields.String(required=True)
+    template_path = fields.String(required=True)
+    dist_path = fields.String(required=True)
+    cache_path = fields.String(missing=CACHE_DIR)
+    config_cache = fields.Boolean(missing=True)
+    default_template = fields.String(required=True)
+
+    # HTML
+    html_base_url = fields.Url(required=True)
+    html_language = fields.String(missing="en-gb")
+    html_charset = fields.String(missing="UTF-8")
+
+    # Images
+    image_widths = fields.List(
+        fields.Integer(validate=validate.Range(min=1)), missing=list
+    )
+    image_workers = fields.Integer(
+        missing=None, allow_none=True, validate=validate.Range(min=1)
+    )
+
+    # Output
+    write_workers = fields.Integer(missing=4, validate=validate.Range(min=1))
+    write_queue_size = fields.Integer(missing=64, validate=validate.Range(min=1))
+    precompress = fields.Boolean(missing=False)
+
+    class Meta:
+        unknown = EXCLUDE
@@ -0,0 +1,172 @@
+"""
+Sharded builds, for splitting the build of one site across machines.
+
+Content files are assigned to shards by a stable hash of their path relative
+to the content directory, so every machine agrees on the partition without
+coordinating. Each shard still loads the metadata of every page, so
+``list_pages`` sees the whole site, but only renders its own files.
+
+A shard writes a manifest of its outputs to the root of its output directory.
+The merge step copies the outputs of all shards into one output directory,
+using the manifests instead of walking the shard directories.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from . import osutils
+from .outputs import is_valid_key, save_manifest
+from .utils import subtract_prefix
+from .writer import OutputWriter
+
+
+# File name of the shard manifest in the root of a shard's output directory.
+SHARD_MANIFEST = ".web-maker-shard.json"
+
+
+class ShardError(Exception):
+    """
+    Errors raised while partitioning or merging sharded builds.
+    """
+
+    pass
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification in the form ``index/count``, where index
+    counts from 1.
+
+    >>> parse_shard('2/4')
+    (2, 4)
+
+    :raise ShardError: When the specification is malformed or out of range.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError as err:
+        raise ShardError("Shard must be in the form index/count, like 1/4") from err
+
+    if count < 1 or not 1 <= index <= count:
+        raise ShardError("Shard index must be between 1 and %d" % count)
+
+    return index, count
+
+
+def shard_of(content_path: str, file_path: str, count: int) -> int:
+    """
+    Shard, counting from 1, that the given content file belongs to.
+
+    The hash is taken over the path relative to the content directory with
+    forward slashes, so it is the same on every machine and platform.
+    """
+    key = subtract_prefix(content_path, os.path.normpath(file_path))
+    key = key.replace(os.sep, "/")
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(
+    content_path: str, file_paths: Iterable[str], shard: Tuple[int, int]
+) -> List[str]:
+    """Filter the given content files down to those in the shard."""
+    index, count = shard
+    return [
+        file_path
+        for file_path in file_paths
+        if shard_of(content_path, file_path, count) == index
+    ]
+
+
+def write_shard_manifest(
+    dist_path: str, shard: Tuple[int, int], outputs: Iterable[str]
+):
+    index, count = shard
+    data = json.dumps({"shard": index, "count": count, "outputs": sorted(outputs)})
+    os.makedirs(dist_path, exist_ok=True)
+    osutils.write_atomic(os.path.join(dist_path, SHARD_MANIFEST), data.encode("utf-8"))
+
+
+def load_shard_manifest(shard_dir: str) -> dict:
+    """
+    :raise ShardError: When the directory has no readable shard manifest.
+    """
+    try:
+        with open(os.path.join(shard_dir, SHARD_MANIFEST), encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError) as err:
+        raise ShardError("No shard manifest in %s" % shard_dir) from err
+
+
+def merge_shards(
+    shard_dirs: Iterable[str],
+    dist_path: str,
+    cache_path: str,
+    writer: OutputWriter,
+):
+    """
+    Copy the outputs of all shards into the output directory, and record
+    the combined outputs in the output manifest.
+
+    :param writer: Closed once every copy is scheduled, so the manifest is
+        only saved after all copies succeeded.
+    :raise ShardError: When shards are missing, duplicated, from different
+        partitions, produced the same output, or list an output outside
+        their output directory.
+    :raise WriteError: When an output fails to copy.
+    """
+    logger = logging.getLogger(__name__)
+
+    manifests: Dict[int, Tuple[str, dict]] = {}
+    for shard_dir in shard_dirs:
+        manifest = load_shard_manifest(shard_dir)
+        if manifest["shard"] in manifests:
+            raise ShardError(
+                "Shard %d found in both %s and %s"
+                % (manifest["shard"], manifests[manifest["shard"]][0], shard_dir)
+            )
+        manifests[manifest["shard"]] = (shard_dir, manifest)
+
+    counts = {manifest["count"] for _, manifest in manifests.values()}
+    if len(counts) != 1:
+        raise ShardError("Shards were built with different shard counts")
+
+    count = counts.pop()
+    missing = sorted(set(range(1, count + 1)) - set(manifests))
+    if missing:
+        raise ShardError(
+            "Missing shards: %s" % ", ".join("%d/%d" % (i, count) for i in missing)
+        )
+
+    owners: Dict[str, int] = {}
+    for index, (shard_dir, manifest) in sorted(manifests.items()):
+        logger.info("Merging shard %d/%d from %s", index, count, shard_dir)
+
+        same_dir = os.path.abspath(shard_dir) == os.path.abspath(dist_path)
+
+        for key in manifest["outputs"]:
+            # Never follow a manifest entry out of the shard or output directory.
+            if not is_valid_key(key):
+                raise ShardError("Invalid output path %s in %s" % (key, shard_dir))
+            if key in owners:
+                raise ShardError(
+                    "Output %s produced by shards %d and %d" % (key, owners[key], index)
+                )
+            owners[key] = index
+
+            if not same_dir:
+                parts = key.split("/")
+                writer.copy(
+                    os.path.join(shard_dir, *parts), os.path.join(dist_path, *parts)
+                )
+
+    writer.close()
+    save_manifest(cache_path, owners.keys())
+
+    # Once merged, the output directory is no longer a single shard.
+    try:
+        os.remove(os.path.join(dist_path, SHARD_MANIFEST))
+    except FileNotFoundError:
+        pass
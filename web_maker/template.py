@@ -2,22 +2,30 @@
 Functions for use inside templates.
 """
 from copy import deepcopy
+import datetime
 import glob
 import os
 import pathlib
 import typing as T
 from urllib.parse import urljoin
 
-from .loader import PageSchema
+from marshmallow import ValidationError
+
+from .converters import OUTPUT_EXTENSIONS
+from .deps import RecordingDict
+from .images import variant_path
+from .loader import DATE_FIELDS, MetaDate, PageSchema, date_sort_key
 from .utils import extract_ext, replace_ext
 
 
-def create_model(config, page_cache):
+def create_model(config, page_cache, recorder=None):
     """
     Creates the top scope template model.
 
     :param config: Config dictionary.
     :param page_cache: Page loader that can retrieve page metadata.
+    :param recorder: Optional dependency recorder, notified of the pages and
+        files the helpers read.
     :return: Dictionary of values that can be passed to all templates.
     """
     model = deepcopy(config)
@@ -26,6 +34,9 @@ def create_model(config, page_cache):
         """
         Loads a file's contents, and outputs it as a string.
         """
+        if recorder is not None:
+            recorder.record_file(file_path)
+
         with open(file_path) as fp:
             return fp.read()
 
@@ -33,9 +44,12 @@ def create_model(config, page_cache):
     model["concat"] = lambda sep, *parts: sep.join(parts)
     model["inline_file"] = inline_file
     model["url"] = create_url_lookup(
-        config["html_base_url"], (config["content_path"],), ext_map={"md": "html"}
+        config["html_base_url"], (config["content_path"],), ext_map=OUTPUT_EXTENSIONS
+    )
+    model["srcset"] = create_srcset(model["url"], config["image_widths"])
+    model["list_pages"] = create_list_pages(
+        config["content_path"], page_cache, recorder=recorder
     )
-    model["list_pages"] = create_list_pages(config["content_path"], page_cache)
 
     return model
 
@@ -112,30 +126,166 @@ def create_url_lookup(
     return url_lookup
 
 
+def create_srcset(
+    url_lookup: T.Callable[[str], str], widths: T.Sequence[int]
+) -> T.Callable[[str], str]:
+    """
+    Creates a helper function for use in templates that lists the URLs of the
+    resized variants of an image, in the format of an ``<img srcset>`` attribute.
+
+    Args:
+        url_lookup: Function that translates project file paths to site URLs.
+        widths: Widths of the generated image variants.
+
+    Return:
+        Function that takes the path to an image in the content directory.
+    """
+
+    def srcset(file_location: str) -> str:
+        return ", ".join(
+            "%s %dw" % (url_lookup(variant_path(file_location, width)), width)
+            for width in sorted(widths)
+        )
+
+    return srcset
+
+
+def match_pages(content_dir, glob_pathname, root_dir=None) -> T.List[str]:
+    """
+    Find the page files in the content folder that match the given glob.
+
+    :param content_dir: Directory where page files are kept.
+    :param glob_pathname: File path glob, relative to the content directory.
+    :param root_dir: Optional root directory where the content directory is located.
+        If None, the current working directory is used.
+    :return: Normalised paths of the matching files.
+    """
+    root_dir = root_dir or os.path.curdir
+    glob_pathname = os.path.join(root_dir, content_dir, glob_pathname)
+
+    return [
+        os.path.normpath(path) for path in glob.glob(glob_pathname, recursive=True)
+    ]
+
+
 def create_list_pages(
-    content_dir, page_cache, root_dir=None
-) -> T.Callable[[str], T.Generator[dict, None, None]]:
+    content_dir, page_cache, root_dir=None, recorder=None
+) -> T.Callable[..., T.Generator[dict, None, None]]:
     """
     Creates a helper function for use in templates for recursively listing pages
     in the content folder.
 
+    Pages can be ordered by a date field, and filtered to a range of dates,
+    using the sort keys computed when the pages' metadata was loaded.
+
     :param content_dir: Directory where page files are kept.
     :param page_cache: Page loader that can retrieve page metadata.
     :param root_dir: Optional root directory where the content directory is located.
         If None, the current working directory is used.
+    :param recorder: Optional dependency recorder, notified of the queried glob
+        and the metadata fields read from the listed pages.
     :return: Function that takes a file path glob, and returns a generator
         that yields page objects.
     """
-    root_dir = root_dir or os.path.curdir
-    target_dir = os.path.join(root_dir, content_dir)
 
-    def list_pages(glob_pathname: str) -> T.Generator[dict, None, None]:
-        glob_pathname = os.path.join(target_dir, glob_pathname)
+    def list_pages(
+        glob_pathname: str, order_by: str = None, since=None, until=None
+    ) -> T.Generator[dict, None, None]:
+        """
+        :param glob_pathname: File path glob, relative to the content directory.
+        :param order_by: Optional date field to order the pages by, like
+            ``published``. Prefix it with ``-`` for newest first. Pages
+            without the date come last.
+        :param since: Optional earliest date of the listed pages, inclusive.
+        :param until: Optional latest date of the listed pages, inclusive.
+            Dates are compared against the ``order_by`` field, or against
+            ``published`` when unordered. Pages without the date are left out.
+        :raise ValueError: When the field isn't a date field, or a date is invalid.
+        """
+        # The query is recorded even when nothing matches, so
+        # pages added later invalidate the result.
+        fields = recorder.record_query(glob_pathname) if recorder else None
+
+        file_paths = match_pages(content_dir, glob_pathname, root_dir)
 
-        for path in glob.glob(glob_pathname, recursive=True):
-            metadata = page_cache.get_meta(path)
+        if order_by is not None or since is not None or until is not None:
+            field = (order_by or "published").lstrip("-")
+            if field not in DATE_FIELDS:
+                raise ValueError(
+                    "Pages can only be ordered by %s, not %s"
+                    % (", ".join(DATE_FIELDS), field)
+                )
+
+            # Ordering and filtering read the field of every page.
+            if fields is not None:
+                fields.add(field)
+
+            file_paths = _order_pages(
+                file_paths,
+                [page_cache.get_sort_keys(path)[field] for path in file_paths],
+                descending=order_by is not None and order_by.startswith("-"),
+                ordered=order_by is not None,
+                since=_range_key(since, end_of_day=False),
+                until=_range_key(until, end_of_day=True),
+            )
+
+        for file_path in file_paths:
+            metadata = page_cache.get_meta(file_path)
             # FIXME: Do we need the processed markdown content here?
-            file_path = os.path.normpath(path)
-            yield PageSchema().load({"meta": metadata, "file_path": file_path})
+            page = PageSchema().load({"meta": metadata, "file_path": file_path})
+
+            if fields is not None:
+                page["meta"] = RecordingDict(page["meta"], fields)
+
+            yield page
 
     return list_pages
+
+
+def _order_pages(
+    file_paths: T.List[str],
+    sort_keys: T.List[T.Optional[int]],
+    descending: bool,
+    ordered: bool,
+    since: T.Optional[int],
+    until: T.Optional[int],
+) -> T.List[str]:
+    if since is not None or until is not None:
+        keyed = [
+            (key, path)
+            for key, path in zip(sort_keys, file_paths)
+            if key is not None
+            and (since is None or key >= since)
+            and (until is None or key <= until)
+        ]
+    else:
+        keyed = list(zip(sort_keys, file_paths))
+
+    if not ordered:
+        return [path for _, path in keyed]
+
+    # Paths break ties, so the order doesn't depend on the filesystem.
+    dated = sorted(
+        ((key, path) for key, path in keyed if key is not None), reverse=descending
+    )
+    undated = sorted(path for key, path in keyed if key is None)
+    return [path for _, path in dated] + undated
+
+
+def _range_key(value, end_of_day: bool) -> T.Optional[int]:
+    """
+    Sort key of a date range boundary, given as a date or an ISO 8601 string.
+    A date without a time includes the whole day.
+    """
+    if value is None:
+        return None
+
+    try:
+        value = MetaDate().deserialize(value)
+    except ValidationError as err:
+        raise ValueError("Invalid date %r" % (value,)) from err
+
+    key = date_sort_key(value)
+    if end_of_day and not isinstance(value, datetime.datetime):
+        key += 86400 - 1
+    return key
@@ -0,0 +1,177 @@
+"""
+Write-behind stage for generated output files.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import shutil
+import threading
+from typing import List, Optional, Set, Union
+
+from .compress import Compressor
+from .events import EventBus, FILE_WRITTEN
+
+
+class WriteError(Exception):
+    """
+    Errors raised while writing generated files to the output directory.
+    """
+
+    pass
+
+
+class OutputWriter(object):
+    """
+    Writes output files on a pool of background threads.
+
+    Rendering hands finished documents to the writer and carries on, while
+    directory creation and file writes happen concurrently in the background.
+    The number of pending writes is bounded, so when the filesystem can't keep
+    up the caller blocks in :meth:`write` until a slot frees up, instead of
+    buffering the whole site in memory.
+
+    Directories are created at most once per writer, no matter how many files
+    are written into them.
+
+    When given a compressor, written text files are compressed on the same
+    worker threads. Copied files are left as they are.
+
+    The writer is a context manager. Leaving the context waits for all pending
+    writes to finish, and raises the first error encountered.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = 64,
+        events: EventBus = None,
+        compressor: Optional[Compressor] = None,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="web-maker-writer"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._dirs: Set[str] = set()
+        self._errors: List[BaseException] = []
+        self._closed = False
+        self._events = events if events is not None else EventBus()
+        self._compressor = compressor
+        self._logger = logging.getLogger(__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Don't mask the original exception with a write error.
+        self.close(raise_errors=exc_type is None)
+
+    def write(self, file_path: str, data: Union[str, bytes]):
+        """
+        Schedule the given data to be written to the file path.
+
+        Strings are encoded as UTF-8. Blocks when the pending queue is full.
+
+        :raise WriteError: When an earlier write has failed, or the writer is closed.
+        """
+        self._submit(self._write_file, file_path, data)
+
+    def copy(self, source_path: str, file_path: str):
+        """
+        Schedule the file at the source path to be copied to the file path.
+
+        Blocks when the pending queue is full.
+
+        :raise WriteError: When an earlier write has failed, or the writer is closed.
+        """
+        self._submit(self._copy_file, source_path, file_path)
+
+    def close(self, raise_errors: bool = True):
+        """
+        Wait for pending writes to finish and shut down the worker threads.
+
+        :raise WriteError: When any write has failed.
+        """
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+
+        if raise_errors:
+            self._raise_errors()
+
+    def _submit(self, fn, *args):
+        if self._closed:
+            raise WriteError("Writer is closed")
+
+        self._raise_errors()
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+
+    def _write_file(self, file_path: str, data: Union[str, bytes]):
+        self._ensure_dir(os.path.dirname(file_path))
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        self._logger.debug("Writing %s", file_path)
+        with open(file_path, "wb") as fp:
+            fp.write(data)
+
+        self._events.emit(FILE_WRITTEN, path=file_path, bytes=len(data))
+
+        if self._compressor is not None and self._compressor.accepts(file_path):
+            for sibling_path, size in self._compressor.compress(file_path, data):
+                self._events.emit(FILE_WRITTEN, path=sibling_path, bytes=size)
+
+    def _copy_file(self, source_path: str, file_path: str):
+        self._ensure_dir(os.path.dirname(file_path))
+
+        self._logger.debug("Copying %s to %s", source_path, file_path)
+        shutil.copyfile(source_path, file_path)
+
+        if self._events.enabled:
+            size = os.path.getsize(file_path)
+            self._events.emit(FILE_WRITTEN, path=file_path, bytes=size)
+
+    def _ensure_dir(self, dir_path: str):
+        if not dir_path:
+            return
+
+        with self._lock:
+            if dir_path in self._dirs:
+                return
+
+        # Concurrent workers may race to create the same
+        # directory, which exist_ok tolerates.
+        os.makedirs(dir_path, exist_ok=True)
+
+        with self._lock:
+            self._dirs.add(dir_path)
+
+    def _on_done(self, future):
+        self._slots.release()
+
+        err = future.exception()
+        if err is not None:
+            with self._lock:
+                self._errors.append(err)
+
+    def _raise_errors(self):
+        with self._lock:
+            if not self._errors:
+                return
+            err = self._errors[0]
+
+        raise WriteError("Error writing output file: %s" % err) from err